@@ -0,0 +1,118 @@
+# scripts/bench_models.py
+# Compare the embedder / CrossEncoder inference backends (torch float32, onnx, onnx-int8) on the
+# real corpus: single-query latency, batch throughput, and agreement with the torch baseline
+# (embedding cosine, top-k retrieval overlap, rerank top-1 and Kendall tau).
+import argparse, glob, json, statistics, time
+from pathlib import Path
+
+import numpy as np
+
+from src.rag_mcp.config import JSON_DIR, EMBED_MODEL, RERANK_MODEL
+from src.rag_mcp.index.chunker import make_chunks
+from src.rag_mcp.index.models import BACKENDS, configure_threads, load_model
+
+QUERIES = [
+    "How much is BSc Computer Science per year?",
+    "What are the Year 2 modules for Information Systems?",
+    "Give me the overview of Business Management.",
+    "How long is the accounting and finance degree?",
+    "When are the intakes for psychology?",
+    "international student fees for software engineering",
+    "what do I study in year 1 of data science",
+    "is there a placement in the hospitality programme",
+]
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def _timed(fn, reps: int):
+    out, times = None, []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return out, times
+
+
+def _kendall_tau(a, b) -> float:
+    n, s = len(a), 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            s += np.sign(a[i] - a[j]) * np.sign(b[i] - b[j])
+    return float(s) / (n * (n - 1) / 2) if n > 1 else 1.0
+
+
+def bench_embedder(backends, texts, reps, k):
+    print(f"\n[embedder] {EMBED_MODEL}: {len(QUERIES)} queries, {len(texts)} chunks")
+    base_q = base_docs = None
+    for backend in backends:
+        model = load_model("embedder", EMBED_MODEL, backend)
+        model.encode(QUERIES[:1], normalize_embeddings=True)  # warm kernels
+        single = []
+        for q in QUERIES:
+            single += _timed(lambda: model.encode([q], normalize_embeddings=True), reps)[1]
+        docs, t_docs = _timed(lambda: model.encode(texts, batch_size=64, normalize_embeddings=True), 1)
+        q_emb = model.encode(QUERIES, normalize_embeddings=True)
+        line = (f"  {backend:10} query p50 {statistics.median(single):7.2f} ms  p95 {_pct(single, 95):7.2f} ms"
+                f"  batch {len(texts) / (t_docs[0] / 1000.0):8.1f} chunks/s")
+        if base_q is None:
+            base_q, base_docs = q_emb, docs
+            line += "  (baseline)"
+        else:
+            cos = float(np.mean(np.sum(docs * base_docs, axis=1)))
+            truth = np.argsort(-(base_q @ base_docs.T), axis=1)[:, :k]
+            got = np.argsort(-(q_emb @ docs.T), axis=1)[:, :k]
+            overlap = statistics.mean(len(set(t) & set(g)) / k for t, g in zip(truth, got))
+            line += f"  cosine vs baseline {cos:.4f}  top-{k} overlap {overlap:.3f}"
+        print(line)
+
+
+def bench_reranker(backends, texts, reps, n_cands):
+    print(f"\n[reranker] {RERANK_MODEL}: {len(QUERIES)} queries x {n_cands} candidates")
+    rng = np.random.default_rng(0)
+    items = [(q, [texts[i] for i in rng.choice(len(texts), size=min(n_cands, len(texts)), replace=False)])
+             for q in QUERIES]
+    base = None
+    for backend in backends:
+        model = load_model("reranker", RERANK_MODEL, backend)
+        model.predict([(QUERIES[0], texts[0])])  # warm kernels
+        scores, lat = [], []
+        for q, cands in items:
+            s, t = _timed(lambda: model.predict([(q, c) for c in cands]), reps)
+            scores.append(np.asarray(s, dtype=np.float32))
+            lat += t
+        pairs = sum(len(c) for _, c in items)
+        line = (f"  {backend:10} per query p50 {statistics.median(lat):7.2f} ms  p95 {_pct(lat, 95):7.2f} ms"
+                f"  {pairs * reps / (sum(lat) / 1000.0):8.1f} pairs/s")
+        if base is None:
+            base = scores
+            line += "  (baseline)"
+        else:
+            top1 = statistics.mean(float(int(np.argmax(a)) == int(np.argmax(b))) for a, b in zip(base, scores))
+            tau = statistics.mean(_kendall_tau(a, b) for a, b in zip(base, scores))
+            line += f"  top-1 agreement {top1:.3f}  Kendall tau {tau:.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                    help="backends to compare; the first is the baseline")
+    ap.add_argument("--models", choices=["embedder", "reranker", "both"], default="both")
+    ap.add_argument("--reps", type=int, default=5, help="timed repetitions per query")
+    ap.add_argument("--k", type=int, default=10, help="retrieval overlap depth")
+    ap.add_argument("--candidates", type=int, default=20, help="rerank candidates per query")
+    args = ap.parse_args()
+
+    threads = configure_threads()
+    texts = [c["text"] for fp in sorted(glob.glob(str(Path(JSON_DIR) / "*.json")))
+             for c in make_chunks(json.loads(Path(fp).read_text(encoding="utf-8")))]
+    print(f"torch threads: intra-op {threads['intra_op']}, inter-op {threads['inter_op']}; "
+          f"ONNX exports are built on first use and cached under each model's onnx/ folder")
+    if args.models in ("embedder", "both"):
+        bench_embedder(args.backends, texts, args.reps, args.k)
+    if args.models in ("reranker", "both"):
+        bench_reranker(args.backends, texts, args.reps, args.candidates)
@@ -0,0 +1,47 @@
+# scripts/bench_parse.py
+# Per-page timing of the single-pass extract_sections() against the original
+# multi-pass extractor, plus an output parity check on every page.
+import argparse, glob, statistics, time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from src.rag_mcp.config import HTML_DIR
+from src.rag_mcp.ingest.fetch_html import load_html
+from src.rag_mcp.ingest.parse_sunway import extract_sections, extract_sections_multipass
+
+
+def _best_ms(fn, reps: int) -> float:
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t0) * 1000.0)
+    return best
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--glob", default=str(Path(HTML_DIR) / "*.html"), help="Glob of HTML files")
+    ap.add_argument("--reps", type=int, default=3, help="timed repetitions per page (best is kept)")
+    ap.add_argument("--parser", default="html.parser", help="BeautifulSoup tree builder")
+    args = ap.parse_args()
+
+    rows, mismatches = [], []
+    for fp in sorted(glob.glob(args.glob)):
+        html = load_html(fp)
+        if extract_sections(html, args.parser) != extract_sections_multipass(html, args.parser):
+            mismatches.append(Path(fp).name)
+        t_parse = _best_ms(lambda: BeautifulSoup(html, args.parser), args.reps)
+        t_old = _best_ms(lambda: extract_sections_multipass(html, args.parser), args.reps)
+        t_new = _best_ms(lambda: extract_sections(html, args.parser), args.reps)
+        rows.append((Path(fp).stem[:48], len(html) // 1024, t_parse, t_old, t_new))
+
+    print(f"{'page':48} {'KB':>4} {'tree ms':>8} {'multi ms':>9} {'single ms':>10} {'extract x':>10}")
+    for name, kb, tp, to, tn in rows:
+        print(f"{name:48} {kb:4d} {tp:8.1f} {to:9.1f} {tn:10.1f} {(to - tp) / max(tn - tp, 1e-6):9.1f}x")
+    tot_old = sum(r[3] for r in rows); tot_new = sum(r[4] for r in rows)
+    print(f"\n{len(rows)} pages: multi-pass {tot_old:.0f} ms, single-pass {tot_new:.0f} ms "
+          f"(median per page {statistics.median(r[3] for r in rows):.1f} -> {statistics.median(r[4] for r in rows):.1f} ms)")
+    print(f"tree building alone: {sum(r[2] for r in rows):.0f} ms")
+    print(f"parity: {len(rows) - len(mismatches)}/{len(rows)} identical" + (f"; differs: {mismatches}" if mismatches else ""))
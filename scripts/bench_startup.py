@@ -0,0 +1,84 @@
+# scripts/bench_startup.py
+# Cold-start regression benchmark for the MCP stdio server: spawn -> initialize and
+# spawn -> tools/list latency over several fresh processes, plus a per-import timing
+# report (python -X importtime) of what the server loads before answering.
+import argparse, json, os, statistics, subprocess, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVER = [sys.executable, "-m", "src.rag_mcp.mcp.server"]
+HEAVY = ("torch", "chromadb", "sentence_transformers", "transformers", "jsonschema")
+
+
+def _rpc(proc, id_, method, params=None):
+    proc.stdin.write(json.dumps({"jsonrpc": "2.0", "id": id_, "method": method, "params": params or {}}) + "\n")
+    proc.stdin.flush()
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"server exited before answering {method}")
+        msg = json.loads(line)
+        if msg.get("id") == id_:
+            return msg
+
+
+def spawn_once(call_query: str = ""):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(SERVER, cwd=ROOT, env=env, text=True, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        _rpc(proc, 1, "initialize", {"protocolVersion": "2024-11-05"})
+        t_init = time.perf_counter() - t0
+        _rpc(proc, 2, "tools/list")
+        t_list = time.perf_counter() - t0
+        t_call = None
+        if call_query:
+            _rpc(proc, 3, "tools/call", {"name": "rag.search", "arguments": {"query": call_query}})
+            t_call = time.perf_counter() - t0
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=60)
+    return t_init * 1000.0, t_list * 1000.0, (t_call * 1000.0 if t_call is not None else None)
+
+
+def import_report(top: int):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.rag_mcp.mcp.server"],
+                         cwd=ROOT, env=env, capture_output=True, text=True).stderr
+    rows = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = [p.strip() for p in line.split(":", 1)[1].split("|")]
+        rows.append((int(cum_us), int(self_us), name))
+    names = {n for _, _, n in rows}
+    print(f"server import: {sum(s for _, s, _ in rows) / 1000.0:.1f} ms across {len(rows)} modules")
+    for cum, own, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cum / 1000.0:8.1f} ms cumulative {own / 1000.0:7.1f} ms self  {name}")
+    loaded = [h for h in HEAVY if h in names]
+    print("heavy modules imported at startup: " + (", ".join(loaded) if loaded else "none"))
+    return loaded
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5, help="fresh server processes to time")
+    ap.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    ap.add_argument("--call", default="", help="also time the first rag.search with this query (loads models)")
+    ap.add_argument("--max-ms", type=float, default=0.0,
+                    help="fail (exit 1) if median spawn->initialize exceeds this, or heavy modules load at startup")
+    args = ap.parse_args()
+
+    loaded = import_report(args.top)
+    runs = [spawn_once(args.call) for _ in range(args.runs)]
+    for label, i in (("spawn -> initialize", 0), ("spawn -> tools/list", 1), ("spawn -> first tools/call", 2)):
+        xs = [r[i] for r in runs if r[i] is not None]
+        if xs:
+            print(f"{label:26} median {statistics.median(xs):8.1f} ms  max {max(xs):8.1f} ms  ({len(xs)} runs)")
+
+    median_init = statistics.median(r[0] for r in runs)
+    if args.max_ms and (median_init > args.max_ms or loaded):
+        print(f"REGRESSION: median spawn->initialize {median_init:.1f} ms (budget {args.max_ms:.0f} ms)"
+              + (f", heavy imports at startup: {', '.join(loaded)}" if loaded else ""))
+        sys.exit(1)
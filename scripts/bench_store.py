@@ -0,0 +1,84 @@
+# scripts/bench_store.py
+# Compare the Chroma (HNSW) and exact (brute-force) vector backends on the real index:
+# per-query latency and recall@k against exact ground truth, with and without filters.
+import argparse, shutil, statistics, tempfile, time
+from pathlib import Path
+
+import numpy as np
+
+from src.rag_mcp.config import CHROMA_DIR, COLLECTION
+from src.rag_mcp.index.store_chroma import get_collection
+from src.rag_mcp.index.store_exact import ExactCollection
+
+INCLUDE = ["documents", "metadatas", "distances"]
+
+
+def _timed(fn, reps: int):
+    out, times = None, []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return out, times
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=200, help="number of (noisy chunk-vector) queries")
+    ap.add_argument("--k", type=int, default=20, help="n_results per query")
+    ap.add_argument("--reps", type=int, default=3, help="timed repetitions per query")
+    ap.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    args = ap.parse_args()
+
+    # work on a copy: benchmarking must never touch the live index
+    tmp = Path(tempfile.mkdtemp(prefix="bench_store_"))
+    shutil.copytree(CHROMA_DIR, tmp / "chroma")
+    _, chroma = get_collection(str(tmp / "chroma"), COLLECTION)
+    data = chroma.get(include=["documents", "metadatas", "embeddings"])
+    emb = np.asarray(data["embeddings"], dtype=np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+
+    exact = ExactCollection(data["ids"], data["documents"], data["metadatas"], emb)
+    exact.save(str(tmp / "exact"), dtype=args.dtype)
+    exact = ExactCollection.load(str(tmp / "exact"))
+    print(f"{len(data['ids'])} chunks, dim {emb.shape[1]}, exact dtype {args.dtype}")
+
+    rng = np.random.default_rng(0)
+    base = emb[rng.integers(0, len(emb), args.queries)]
+    queries = base + 0.3 * rng.normal(size=base.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    metas = data["metadatas"]
+    programmes = sorted({m.get("programme_name") for m in metas if m.get("programme_name")})
+
+    for label, make_where in [
+        ("unfiltered", lambda i: None),
+        ("programme", lambda i: {"programme_name": {"$eq": programmes[i % len(programmes)]}}),
+        ("programme+section", lambda i: {"$and": [{"section": {"$eq": "fees"}},
+                                                   {"programme_name": {"$eq": programmes[i % len(programmes)]}}]}),
+    ]:
+        t_chroma, t_exact, recall = [], [], []
+        for i, q in enumerate(queries):
+            where = make_where(i)
+            a, ta = _timed(lambda: chroma.query(query_embeddings=[q.tolist()], n_results=args.k,
+                                                include=INCLUDE, where=where), args.reps)
+            b, tb = _timed(lambda: exact.query(query_embeddings=[q.tolist()], n_results=args.k,
+                                               include=INCLUDE, where=where), args.reps)
+            t_chroma += ta; t_exact += tb
+            truth = set(b["ids"][0])
+            if truth:
+                recall.append(len(truth & set(a["ids"][0])) / len(truth))
+        print(f"\n[{label}] k={args.k}")
+        print(f"  chroma  p50 {statistics.median(t_chroma):7.3f} ms  p95 {_pct(t_chroma, 95):7.3f} ms"
+              f"  recall@k vs exact {statistics.mean(recall) if recall else float('nan'):.4f}")
+        print(f"  exact   p50 {statistics.median(t_exact):7.3f} ms  p95 {_pct(t_exact, 95):7.3f} ms  recall@k 1.0000")
+
+    # batched: every query in one call
+    _, tbc = _timed(lambda: chroma.query(query_embeddings=queries.tolist(), n_results=args.k, include=INCLUDE), 1)
+    _, tbe = _timed(lambda: exact.query(query_embeddings=queries.tolist(), n_results=args.k, include=INCLUDE), 1)
+    print(f"\n[batch of {len(queries)}] chroma {tbc[0]:.2f} ms  exact {tbe[0]:.2f} ms")
+    shutil.rmtree(tmp, ignore_errors=True)
@@ -1,22 +1,65 @@
-import argparse, json, glob
+import argparse, json, glob, os, sys, time
 from pathlib import Path
-from src.rag_mcp.config import JSON_DIR, CHROMA_DIR, COLLECTION
-from src.rag_mcp.index.chunker import make_chunks
-from src.rag_mcp.index.store_chroma import get_collection, upsert_chunks
+from src.rag_mcp.config import (JSON_DIR, COLLECTION, VECTOR_BACKEND, EXACT_DTYPE,
+                               EMBED_BATCH_SIZE, UPSERT_BATCH_SIZE)
+from src.rag_mcp.index.manifest import load_manifest, save_manifest, plan_build
+from src.rag_mcp.index.store import index_dir, open_for_build, upsert_chunks, write_index_version
+from src.rag_mcp.index.embedder import encode, embed_vectors_id, embed_cache_stats
+from src.rag_mcp.index.aliases import build_aliases, write_aliases
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--only", help="programme id slug (matches filename)", default=None)
+    ap.add_argument("--backend", choices=["chroma", "exact"], default=VECTOR_BACKEND,
+                    help="vector store to build (default: VECTOR_BACKEND)")
+    ap.add_argument("--full", action="store_true",
+                    help="re-embed and upsert every programme, ignoring the manifest")
+    ap.add_argument("--embed-batch", type=int, default=EMBED_BATCH_SIZE, help="chunks per encode() batch")
+    ap.add_argument("--upsert-batch", type=int, default=UPSERT_BATCH_SIZE, help="chunks per upsert() call")
     args = ap.parse_args()
 
     files = glob.glob(str(Path(JSON_DIR) / "*.json"))
+    out_dir = index_dir(args.backend)
+    os.makedirs(out_dir, exist_ok=True)
+    # programme aliases for the server's lexical matcher (always from every record)
+    write_aliases(out_dir, build_aliases(json.loads(Path(fp).read_text(encoding="utf-8")) for fp in files))
     if args.only:
         files = [f for f in files if Path(f).stem.endswith(args.only.split(":")[-1])]
-    client, col = get_collection(CHROMA_DIR, COLLECTION)
-    total = 0
-    for fp in files:
-        p = json.loads(Path(fp).read_text(encoding="utf-8"))
-        chunks = make_chunks(p)
-        upsert_chunks(client, col, chunks)
-        total += len(chunks)
-    print(f"Upserted {total} chunks to collection {COLLECTION} at {CHROMA_DIR}")
+    programmes = [json.loads(Path(fp).read_text(encoding="utf-8")) for fp in sorted(files)]
+
+    # only programmes whose source_hash / chunks changed since the last build are re-embedded
+    manifest = load_manifest(out_dir)
+    try:
+        chunks, stale, manifest, counts = plan_build(manifest, programmes, embed_vectors_id(),
+                                                     full=args.full, partial=bool(args.only))
+    except RuntimeError as e:
+        sys.exit(str(e))  # --only after an embed model change
+    if chunks or stale:
+        client, col = open_for_build(args.backend)
+        if chunks:
+            # embed with EMBED_MODEL so stored vectors match what search() queries with;
+            # all changed chunks go through encode() together, in length-sorted batches
+            t0 = time.perf_counter()
+            embeddings = encode([c["text"] for c in chunks], batch_size=args.embed_batch)
+            t1 = time.perf_counter()
+            calls = upsert_chunks(client, col, chunks, embeddings=embeddings, batch_size=args.upsert_batch)
+            t2 = time.perf_counter()
+            print(f"Embedded {len(chunks)} chunks in {t1 - t0:.2f}s ({len(chunks) / max(t1 - t0, 1e-9):.1f} chunks/sec), "
+                  f"upserted in {calls} call(s) in {t2 - t1:.2f}s ({len(chunks) / max(t2 - t1, 1e-9):.1f} chunks/sec)")
+            cache = embed_cache_stats()
+            if cache:
+                print(f"Embedding cache: {cache['hits']} hits, {cache['misses']} misses, {cache['entries']} entries")
+        if stale:
+            col.delete(ids=stale)
+        if args.backend == "exact":
+            col.save(out_dir, dtype=EXACT_DTYPE)
+        # tell running servers to reopen the collection
+        write_index_version(out_dir, backend=args.backend, collection=COLLECTION, chunks_upserted=len(chunks),
+                            chunks_deleted=len(stale), embed_model=embed_vectors_id())
+    save_manifest(out_dir, manifest)
+    print(f"Programmes: {counts['programmes_changed']} changed, {counts['programmes_unchanged']} unchanged, "
+          f"{counts['programmes_removed']} removed")
+    print(f"Chunks: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed "
+          f"in collection {COLLECTION} at {out_dir}")
+    if not (chunks or stale):
+        print("Index already up to date.")
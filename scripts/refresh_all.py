@@ -1,14 +1,40 @@
 # scripts/refresh_all.py
-import subprocess, sys, shlex
+import argparse, sys
+from pathlib import Path
 
-def run(cmd):
-    print(f"\n$ {cmd}")
-    proc = subprocess.run(shlex.split(cmd), check=True)
-    return proc.returncode
+from src.rag_mcp.config import HTML_DIR, VECTOR_BACKEND
+from src.rag_mcp.pipeline import refresh
 
 if __name__ == "__main__":
-    # 1) make/refresh all JSONs from every HTML in data/html/
-    run("python scripts/sync_batch.py --glob data/html/*.html")
-    # 2) rebuild/ups ert the index (Chroma PersistentClient persists on disk)
-    run("python scripts/build_index.py")
-    print("\nAll done. Collection refreshed.")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--glob", default=str(Path(HTML_DIR) / "*.html"),
+                    help="Glob of HTML files; any other than the default refreshes only those "
+                         "programmes and leaves the rest of the index alone")
+    ap.add_argument("--backend", choices=["chroma", "exact"], default=VECTOR_BACKEND,
+                    help="vector store to refresh (default: VECTOR_BACKEND)")
+    ap.add_argument("--no-write-json", action="store_true",
+                    help="index straight from the HTML without updating data/json/")
+    ap.add_argument("--full", action="store_true", help="re-embed every programme, ignoring the manifest")
+    ap.add_argument("--queue-size", type=int, default=8, help="items buffered between pipeline stages")
+    args = ap.parse_args()
+
+    # one process, one pass: parse -> validate -> chunk -> embed -> upsert, stages overlapping
+    partial = args.glob != ap.get_default("glob")
+    try:
+        summary = refresh(args.glob, backend=args.backend, write_json=not args.no_write_json,
+                          full=args.full, partial=partial, queue_size=args.queue_size)
+    except RuntimeError as e:
+        sys.exit(str(e))  # a subset after an embed model change
+
+    print(f"{'stage':10} {'in':>5} {'out':>5} {'busy s':>8} {'wait s':>8} {'items/s':>9}")
+    for s in summary["stages"]:
+        rate = f"{s['items_per_s']:9.1f}" if s["items_per_s"] is not None else f"{'-':>9}"
+        print(f"{s['stage']:10} {s['items_in']:5d} {s['items_out']:5d} {s['busy_s']:8.3f} {s['wait_s']:8.3f} {rate}")
+    c = summary["counts"]
+    print(f"\nProgrammes: {c['programmes_changed']} changed, {c['programmes_unchanged']} unchanged, "
+          f"{c['programmes_removed']} removed; JSON files written: {summary['json_written']}")
+    print(f"Chunks: {c['added']} added, {c['updated']} updated, {c['removed']} removed")
+    if summary["parse_cache"]:
+        print(f"Parse cache: {summary['parse_cache']['hits']} hits, {summary['parse_cache']['misses']} parsed")
+    state = "new index version published" if summary["published"] else "index already up to date"
+    print(f"\nAll done in {summary['elapsed_s']:.2f}s ({state}, {summary['index_dir']}).")
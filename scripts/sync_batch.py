@@ -1,60 +1,39 @@
 # scripts/sync_batch.py (only the make_programme_json() differs slightly)
-import argparse, json, hashlib, re
+import argparse, glob, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import date
-from src.rag_mcp.config import HTML_DIR, JSON_DIR, BASE_DIR
+from src.rag_mcp.config import HTML_DIR, JSON_DIR, PARSE_CACHE_DIR
 from src.rag_mcp.ingest.fetch_html import load_html
+from src.rag_mcp.ingest.parse_cache import ParseCache, PARSER_VERSION
 from src.rag_mcp.ingest.parse_sunway import extract_sections
+from src.rag_mcp.ingest.programme import SCHEMA_PATH, programme_from_sections, render, json_path_for, write_if_changed
 from src.rag_mcp.ingest.validate import validate_programme
 
-SCHEMA_PATH = Path(BASE_DIR) / "src/rag_mcp/schemas/programme.schema.json"
-
-def slugify(s: str) -> str:
-    return re.sub(r"[^a-z0-9]+", "-", s.lower()).strip("-")
-
-def compute_content_hash(obj) -> str:
-    data = json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")
-    return hashlib.sha256(data).hexdigest()
-
-def make_programme_json(html_path: Path, defaults) -> dict:
-    from src.rag_mcp.ingest.normalize import parse_fees  # reuse common logic
-
+def make_programme_json(html_path: Path, defaults, parser: str = "html.parser", cache: ParseCache = None) -> dict:
     html = load_html(str(html_path))
-    mini = extract_sections(html)  # overview_text, structure[], fees_text, fees_note, duration, intakes, career_prospects
-
-    # infer a temp programme_name from filename if not provided
-    programme_name = defaults.programme_name or html_path.stem.replace("_", " ").replace("-", " ").title()
-    pid = f"sunway:{slugify(defaults.school or 'sc')}:{slugify(programme_name)}"
-
-    fees = parse_fees(mini.get("fees_text",""), mini.get("fees_note",""))
-    duration = mini.get("duration") or (defaults.duration or "")
-    intakes  = mini.get("intakes") or (defaults.intakes or "")
-    intakes_list = [s.strip() for s in intakes.split(",") if s.strip()] if isinstance(intakes, str) else intakes
-
-    payload = {
-        "id": pid,
-        "programme_name": programme_name,
-        "school": defaults.school or "",
-        "level": defaults.level or "Undergraduate",
-        "duration": duration,
-        "intakes": intakes_list,
-        "url": defaults.url or "https://sunwayuniversity.edu.my",
-        "overview_text": mini.get("overview_text","").strip(),
-        "structure": mini.get("structure",[]),
-        "fees": fees,
-        "career_prospects": mini.get("career_prospects", []),
-        "last_fetched": date.today().isoformat(),
-    }
-
-    payload["source_hash"] = compute_content_hash({
-        "overview_text": payload["overview_text"],
-        "structure": payload["structure"],
-        "fees": payload["fees"],
-        "duration": payload["duration"],
-        "intakes": payload["intakes"],
-        "career_prospects": payload["career_prospects"]
-    })
-    return payload
+    # an unchanged page (same HTML, same parser code) skips BeautifulSoup entirely
+    mini = cache.extract(html, parser)[0] if cache is not None else extract_sections(html, parser=parser)
+    return programme_from_sections(html_path, mini, defaults)
+
+def ingest_one(html_path: str, defaults, parser: str = "html.parser", check_parity: bool = False,
+               cache_dir: str = ""):
+    """
+    Worker: load_html -> extract_sections -> parse_fees -> validate_programme.
+
+    Returns (payload, parity_mismatch, parse_cache_hits, parse_cache_misses).
+    With check_parity, the page is also parsed with html.parser; if the two
+    JSON renderings differ, the html.parser payload is returned and
+    parity_mismatch is True. cache_dir enables the parse cache ("" = off).
+    """
+    cache = ParseCache(cache_dir) if cache_dir else None
+    payload = make_programme_json(Path(html_path), defaults, parser=parser, cache=cache)
+    mismatch = False
+    if check_parity and parser != "html.parser":
+        reference = make_programme_json(Path(html_path), defaults, cache=cache)
+        if render(reference) != render(payload):
+            payload, mismatch = reference, True
+    validate_programme(payload, str(SCHEMA_PATH))
+    return payload, mismatch, (cache.hits if cache else 0), (cache.misses if cache else 0)
 
 def main():
     ap = argparse.ArgumentParser()
@@ -66,32 +45,58 @@ def main():
     ap.add_argument("--duration", default="")
     ap.add_argument("--intakes", default="")
     ap.add_argument("--force", action="store_true")
+    ap.add_argument("--workers", type=int, default=1, help="parser processes (0 = one per CPU, 1 = serial)")
+    ap.add_argument("--parser", default="html.parser", choices=["html.parser", "lxml"],
+                    help="BeautifulSoup tree builder (lxml is faster; needs the lxml package)")
+    ap.add_argument("--check-parity", action="store_true",
+                    help="also parse with html.parser and keep its output where the JSON differs")
+    ap.add_argument("--no-parse-cache", action="store_true", help="always re-parse every page")
     args = ap.parse_args()
 
+    if args.parser != "html.parser":
+        from bs4.builder import builder_registry
+        if builder_registry.lookup(args.parser) is None:
+            sys.exit(f"[sync] parser '{args.parser}' is not installed (pip install {args.parser})")
+
     outdir = Path(JSON_DIR); outdir.mkdir(parents=True, exist_ok=True)
     changed, skipped = 0, 0
-
-    for html_path in sorted(Path().glob(args.glob)):
-        payload = make_programme_json(html_path, args)
-        json_path = outdir / f"{slugify(payload['programme_name'])}.json"
-
-        previous = None
-        if json_path.exists():
-            try:
-                previous = json.loads(json_path.read_text(encoding="utf-8"))
-            except Exception:
-                previous = None
-
-        if previous and (previous.get("source_hash") == payload["source_hash"]) and not args.force:
+    paths = sorted(glob.glob(args.glob))
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    cache_dir = "" if args.no_parse_cache else PARSE_CACHE_DIR
+    pruned = ParseCache(cache_dir).prune() if cache_dir else 0
+
+    t0 = time.perf_counter()
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields in input order, so output and logs are deterministic
+            n = len(paths)
+            results = list(pool.map(ingest_one, paths, [args] * n, [args.parser] * n, [args.check_parity] * n,
+                                    [cache_dir] * n, chunksize=max(1, n // (workers * 4))))
+    else:
+        results = [ingest_one(p, args, args.parser, args.check_parity, cache_dir) for p in paths]
+    elapsed = time.perf_counter() - t0
+
+    mismatches = []
+    for html_path, (payload, mismatch, _, _) in zip(paths, results):
+        if mismatch:
+            mismatches.append(Path(html_path).name)
+        if not write_if_changed(str(outdir), payload, force=args.force):
             skipped += 1
             continue
-
-        validate_programme(payload, str(SCHEMA_PATH))
-        json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
         changed += 1
-        print(f"[updated] {json_path.name}")
-
-    print(f"\nDone. Updated: {changed}  Skipped (unchanged): {skipped}  JSON dir: {outdir}")
+        print(f"[updated] {json_path_for(str(outdir), payload).name}")
+
+    if args.check_parity and args.parser != "html.parser":
+        print(f"\nParity ({args.parser} vs html.parser): {len(paths) - len(mismatches)}/{len(paths)} identical")
+        for name in mismatches:
+            print(f"  [mismatch, kept html.parser output] {name}")
+    if cache_dir:
+        hits, misses = sum(r[2] for r in results), sum(r[3] for r in results)
+        print(f"\nParse cache (parser version {PARSER_VERSION}): {hits} hits, {misses} parsed, "
+              f"{ParseCache(cache_dir).entries()} entries" + (f", pruned {pruned} stale version(s)" if pruned else ""))
+    print(f"\nParsed {len(paths)} pages in {elapsed:.2f}s with {workers} worker(s), parser {args.parser}")
+    print(f"Done. Updated: {changed}  Skipped (unchanged): {skipped}  JSON dir: {outdir}")
 
 if __name__ == "__main__":
     main()
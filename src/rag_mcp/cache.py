@@ -0,0 +1,208 @@
+# src/rag_mcp/cache.py
+import json, os, re, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+_PUNCT_EDGE = re.compile(r"^[\s\W_]+|[\s\W_]+$")
+
+def normalize_query(query: str, keep_case: bool = False) -> str:
+    """
+    Whitespace and leading/trailing punctuation do not change the answer.
+    Case only doesn't for uncased models: the programme matcher reads "IT" / "CS"
+    as acronyms but "it" / "cs" as words, so routing-level keys keep it.
+    """
+    q = " ".join((query or "").split())
+    return _PUNCT_EDGE.sub("", q if keep_case else q.lower())
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by total size in bytes, with optional TTL.
+
+    Values must be JSON-serializable: they are stored serialized, which both
+    measures their size and hands every caller a fresh copy on get().
+    String keys count towards the size too, and only caches with string
+    keys can be save()d / load()ed.
+
+    Args:
+      max_bytes: evict least-recently-used entries beyond this size (0 disables the cache).
+      ttl: seconds an entry stays valid (0 = no expiry).
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 0.0):
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self._data: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            blob, stored_at = item
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return json.loads(blob)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_bytes <= 0:
+            return
+        self._put_blob(key, json.dumps(value))  # ASCII-escaped, so len() is the size in bytes
+
+    def _put_blob(self, key: Hashable, blob: str) -> None:
+        if self._size(key, blob) > self.max_bytes:
+            return  # would evict everything and still not fit
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (blob, time.monotonic())
+            self._bytes += self._size(key, blob)
+            while self._bytes > self.max_bytes:
+                old, _ = next(iter(self._data.items()))
+                self._drop(old)
+                self.evictions += 1
+
+    @staticmethod
+    def _size(key: Hashable, blob: str) -> int:
+        return len(blob) + (len(key) if isinstance(key, str) else 0)
+
+    def save(self, path: str) -> int:
+        """Write all entries (LRU order) to `path` atomically; returns the entry count."""
+        with self._lock:
+            entries = [[k, blob] for k, (blob, _) in self._data.items()]
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": entries}, f)
+        os.replace(tmp, path)
+        return len(entries)
+
+    def load(self, path: str) -> int:
+        """Add entries saved by save(); a missing or corrupt file loads nothing."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)["entries"]
+        except Exception:
+            return 0
+        for k, blob in entries:
+            self._put_blob(k, blob)
+        return len(entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Hashable) -> None:
+        blob, _ = self._data.pop(key)
+        self._bytes -= self._size(key, blob)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class SemanticCache:
+    """
+    Small cache of recent query embeddings and their final results.
+
+    lookup() returns the cached value of the most similar stored query when
+    its cosine similarity is at least `threshold` and its `tag` (routing
+    decision, index version, ...) is equal to the caller's. Embeddings must
+    be L2-normalized, so the similarity is a single matrix-vector product.
+    At most `max_entries` are kept; the least recently used one is replaced.
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = int(max_entries)
+        self.threshold = float(threshold)
+        self._emb: Optional[np.ndarray] = None  # [max_entries, dim], allocated on first put
+        self._tags: list = []
+        self._blobs: list = []
+        self._used = np.zeros(max(self.max_entries, 0), dtype=np.int64)  # LRU clock per slot
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.lookups = self.hits = self.inserts = self.evictions = 0
+
+    def lookup(self, emb, tag: Hashable) -> Optional[Any]:
+        if self.max_entries <= 0:
+            return None
+        q = np.asarray(emb, dtype=np.float32).ravel()
+        with self._lock:
+            self.lookups += 1
+            n = len(self._tags)
+            if n == 0:
+                return None
+            sims = self._emb[:n] @ q
+            best = None
+            for i in np.argsort(-sims):
+                if sims[i] < self.threshold:
+                    break
+                if self._tags[i] == tag:
+                    best = int(i)
+                    break
+            if best is None:
+                return None
+            self._clock += 1
+            self._used[best] = self._clock
+            self.hits += 1
+            blob = self._blobs[best]
+        return json.loads(blob)
+
+    def put(self, emb, tag: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        q = np.asarray(emb, dtype=np.float32).ravel()
+        blob = json.dumps(value)
+        with self._lock:
+            if self._emb is None:
+                self._emb = np.zeros((self.max_entries, q.shape[0]), dtype=np.float32)
+            n = len(self._tags)
+            if n < self.max_entries:
+                slot = n
+                self._tags.append(tag)
+                self._blobs.append(blob)
+            else:
+                slot = int(self._used.argmin())
+                self._tags[slot] = tag
+                self._blobs[slot] = blob
+                self.evictions += 1
+            self._emb[slot] = q
+            self._clock += 1
+            self._used[slot] = self._clock
+            self.inserts += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tags.clear()
+            self._blobs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": (self.hits / self.lookups) if self.lookups else 0.0,
+                "inserts": self.inserts,
+                "evictions": self.evictions,
+                "entries": len(self._tags),
+                "max_entries": self.max_entries,
+            }
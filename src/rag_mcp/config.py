@@ -9,6 +9,9 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 JSON_DIR = os.path.join(DATA_DIR, "json")
 HTML_DIR = os.path.join(DATA_DIR, "html")
 CHROMA_DIR = os.getenv("CHROMA_DIR", os.path.join(DATA_DIR, "chroma"))
+EXACT_DIR = os.getenv("EXACT_DIR", os.path.join(DATA_DIR, "exact"))
+# extract_sections() results keyed by HTML hash + parser version; empty disables
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", os.path.join(DATA_DIR, "parse_cache"))
 
 # NEW: local models dir
 MODELS_DIR = os.path.join(BASE_DIR, "models")
@@ -23,10 +26,63 @@ RERANK_MODEL = os.getenv(
     os.path.join(MODELS_DIR, "ms-marco-MiniLM-L6-v2"),
 )
 
+# inference backend per model: "torch" (float32), "onnx", or "onnx-int8" (dynamic int8 quantization);
+# ONNX files are exported from the local weights once and cached in <model dir>/onnx/
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch")
+ONNX_QUANT_CONFIG = os.getenv("ONNX_QUANT_CONFIG", "avx2")  # int8 kernels: arm64 | avx2 | avx512 | avx512_vnni
+# torch intra-op / inter-op threads for every model in the process (0 = torch's default)
+MODEL_THREADS = int(os.getenv("MODEL_THREADS", "0"))
+MODEL_INTEROP_THREADS = int(os.getenv("MODEL_INTEROP_THREADS", "0"))
+
 # Chunking
 CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "600"))   # ~450 words
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "80"))  # ~60 words
 
+# Index builds: chunks per encode() batch (sorted by length) and per bulk upsert() call
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "1000"))
+# chunk embeddings keyed by (model id, text hash), reused across rebuilds; empty disables
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(DATA_DIR, "embed_cache"))
+
 # Retrieval
 TOP_K = int(os.getenv("TOP_K", "5"))
 COLLECTION = os.getenv("COLLECTION", "sunway_programmes")
+# "chroma": sqlite + HNSW (CHROMA_DIR); "exact": memory-mapped matrix, brute-force search (EXACT_DIR)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+EXACT_DTYPE = os.getenv("EXACT_DTYPE", "float32")  # on-disk dtype for the exact backend: float32 | float16
+# "single": one over-fetched query ranked by filter tier in memory; "cascade": up to 3 filtered queries
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "single")
+RETRIEVAL_OVERFETCH = int(os.getenv("RETRIEVAL_OVERFETCH", "512"))  # >= corpus size => exact tiers
+
+# answer fee/duration/intake questions about a clearly named programme from the fact table
+FACT_FAST_PATH = os.getenv("FACT_FAST_PATH", "1").lower() in ("1", "true", "yes")
+
+# rag.search result cache (keyed by normalized query, top_k and index version); 0 bytes disables
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))  # seconds, 0 = until index changes
+# near-duplicate queries (cosine >= threshold, same routing) reuse cached results; 0 entries disables
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# CrossEncoder scores keyed by (normalized query, chunk hash); set the path to persist across restarts
+RERANK_CACHE_MAX_BYTES = int(os.getenv("RERANK_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+RERANK_CACHE_PATH = os.getenv("RERANK_CACHE_PATH", "")
+# "adaptive": skip/shrink the CrossEncoder pass when retrieval is decisive; "always": rerank everything
+RERANK_POLICY = os.getenv("RERANK_POLICY", "adaptive")
+RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", "0.15"))  # top-1 vs top-2 dense score
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "0"))  # 0 = no latency budget
+
+# micro-batching of concurrent query embeddings / rerank pairs: the first request waits up to
+# BATCH_MAX_WAIT_MS for others (0 = no batching), at most BATCH_MAX_SIZE items per forward pass,
+# items grouped into BATCH_BUCKET_TOKENS-wide length buckets
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_BUCKET_TOKENS = int(os.getenv("BATCH_BUCKET_TOKENS", "32"))
+
+# Server: max tools/call requests dispatched concurrently (1 = serial)
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", "4"))
+# load models, collection and programme embeddings in a background thread right after initialize
+WARMUP = os.getenv("WARMUP", "1").lower() in ("1", "true", "yes")
+# tool argument/response schema checks: "off", "sampled" (log violations on a fraction of calls), "strict" (reject)
+SCHEMA_VALIDATION = os.getenv("SCHEMA_VALIDATION", "sampled")
+SCHEMA_SAMPLE_RATE = float(os.getenv("SCHEMA_SAMPLE_RATE", "0.01"))
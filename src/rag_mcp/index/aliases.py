@@ -0,0 +1,177 @@
+# src/rag_mcp/index/aliases.py
+"""
+Lexical programme-name matching.
+
+Aliases ("Computer Science", "CS", "Business Management", ...) are derived
+from the programme records at index build time and written next to the
+index. At query time a token inverted index over those aliases resolves
+most programme mentions without touching the embedder.
+"""
+import json, os, re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ALIASES_FILE = "programme_aliases.json"
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+STOPWORDS = {"and", "in", "of", "with", "the", "for", "a", "an"}
+
+# common short forms in queries -> the word used in programme names
+ABBREVIATIONS = {
+    "mgmt": "management", "mgt": "management", "mngt": "management",
+    "eng": "engineering", "engg": "engineering", "engr": "engineering",
+    "sci": "science", "comp": "computer", "tech": "technology",
+    "info": "information", "biz": "business", "intl": "international",
+    "econ": "economics", "fin": "finance", "acct": "accounting",
+    "psych": "psychology", "psy": "psychology", "stats": "statistical",
+    "arch": "architecture",
+}
+
+# degree words: a lowercase acronym right after one of these still counts ("bsc cs")
+DEGREE_TOKENS = {"bsc", "ba", "bachelor", "bachelors", "degree", "hons", "honours"}
+# ...also with one of these in between ("bsc in cs"); on their own they are just words ("finish in as little")
+DEGREE_LINKS = {"in", "of"}
+
+_SUFFIX_RE = re.compile(r"\s*[_|-]?\s*sunway university\s*$", re.I)
+_HONOURS_RE = re.compile(r"\(\s*hon(?:ou)?r?s\s*\)|\bwith\s+honours\b", re.I)
+_DEGREE_RE = re.compile(
+    r"^(?:bachelor|ba|bsc|doctor|master)\b(?:\s+of)?(?:\s+(?:arts|science)(?=\s+\S))?(?:\s+in)?\s+",
+    re.I,
+)
+_PAREN_RE = re.compile(r"\(([^)]*)\)")
+
+def tokens(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens, abbreviations expanded, stopwords dropped."""
+    out = []
+    for t in _TOKEN_RE.findall(text or ""):
+        t = t.lower()
+        t = ABBREVIATIONS.get(t, t)
+        if t not in STOPWORDS:
+            out.append(t)
+    return out
+
+def _squash(s: str) -> str:
+    return " ".join(s.split())
+
+def programme_aliases(name: str) -> List[Dict[str, Any]]:
+    """
+    Aliases for one programme name, most specific first.
+
+    Returns a list of {"alias": str, "primary": bool, "acronym": bool}.
+    Primary aliases (full name, subject) beat derived ones (subject without
+    its parenthetical, specialisation, acronym) when two programmes match.
+    """
+    full = _squash(_SUFFIX_RE.sub("", name))
+    core = _squash(_DEGREE_RE.sub("", _squash(_HONOURS_RE.sub(" ", full))))
+    stripped = _squash(_PAREN_RE.sub(" ", core))
+    out: List[Dict[str, Any]] = []
+
+    def add(alias: str, primary: bool, acronym: bool = False) -> None:
+        alias = _squash(alias)
+        if alias and tokens(alias) and all(a["alias"].lower() != alias.lower() for a in out):
+            out.append({"alias": alias, "primary": primary, "acronym": acronym})
+
+    add(full, True)
+    add(core, True)
+    add(stripped, stripped == core)
+    for inner in _PAREN_RE.findall(core):
+        add(inner, False)
+    words = tokens(stripped)
+    if len(words) >= 2 and "".join(w[0] for w in words) not in DEGREE_TOKENS:  # "BA" is a degree, not Business Analytics
+        add("".join(w[0] for w in words).upper(), False, acronym=True)
+    return out
+
+def build_aliases(programmes: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """programme_name -> aliases, for every record with a name."""
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for p in programmes:
+        name = (p.get("programme_name") or "").strip()
+        if name and name not in out:
+            out[name] = programme_aliases(name)
+    return out
+
+def write_aliases(persist_dir: str, aliases: Dict[str, List[Dict[str, Any]]]) -> str:
+    path = os.path.join(persist_dir, ALIASES_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(aliases, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+def read_aliases(persist_dir: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    try:
+        with open(os.path.join(persist_dir, ALIASES_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+class ProgrammeMatcher:
+    """
+    Token inverted index over programme aliases.
+
+    match_all() scans the query once; for each token it only checks aliases
+    starting with that token, and returns every programme named in the
+    query with its best alias score. A hit inside the span of a
+    better-scoring hit of another programme ("Finance" in "Accounting and
+    Finance") is part of that name, not a mention of its own.
+
+    match() keeps the programme(s) with the best score: one name means the
+    routing is unambiguous, several mean the caller should break the tie
+    (e.g. with embeddings), none means no programme was named.
+    """
+
+    def __init__(self, aliases: Dict[str, List[Dict[str, Any]]]):
+        # first token -> [(alias tokens, programme, score, acronym)]
+        self._index: Dict[str, List[Tuple[Tuple[str, ...], str, float, bool]]] = {}
+        for name, entries in aliases.items():
+            for a in entries:
+                toks = tuple(tokens(a["alias"]))
+                if not toks:
+                    continue
+                score = len(toks) + (0.5 if a.get("primary") else 0.0)
+                self._index.setdefault(toks[0], []).append((toks, name, score, bool(a.get("acronym"))))
+
+    def match(self, query: str) -> List[str]:
+        return self.best(self.match_all(query))
+
+    @staticmethod
+    def best(found: Dict[str, float]) -> List[str]:
+        """The top-scoring names of a match_all() result, sorted."""
+        if not found:
+            return []
+        top = max(found.values())
+        return sorted(n for n, s in found.items() if s == top)
+
+    def match_all(self, query: str) -> Dict[str, float]:
+        raw = _TOKEN_RE.findall(query or "")
+        qt: List[str] = []
+        upper: List[bool] = []  # parallel to qt: token was written in capitals
+        prev_degree: List[bool] = []
+        last = ""
+        for r in raw:
+            t = ABBREVIATIONS.get(r.lower(), r.lower())
+            if t in STOPWORDS:
+                if not (t in DEGREE_LINKS and last in DEGREE_TOKENS):
+                    last = t
+                continue
+            qt.append(t)
+            upper.append(r.isupper())
+            prev_degree.append(last in DEGREE_TOKENS)
+            last = t
+
+        hits: List[Tuple[int, int, str, float]] = []  # (start, end, programme, score)
+        for i, t in enumerate(qt):
+            for toks, name, score, acronym in self._index.get(t, ()):
+                if tuple(qt[i:i + len(toks)]) != toks:
+                    continue
+                # short acronyms collide with words ("it", "is"): need capitals or a degree word before
+                if acronym and len(t) <= 2 and not (upper[i] or prev_degree[i]):
+                    continue
+                hits.append((i, i + len(toks), name, score))
+
+        found: Dict[str, float] = {}
+        for start, end, name, score in hits:
+            if any(n != name and s > score and a <= start and end <= b for a, b, n, s in hits):
+                continue
+            if score > found.get(name, 0.0):
+                found[name] = score
+        return found
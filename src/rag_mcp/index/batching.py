@@ -0,0 +1,188 @@
+# src/rag_mcp/index/batching.py
+"""
+Micro-batching in front of a model, for concurrent searches.
+
+Each search used to call model.encode([query]) / model.predict(pairs) on
+its own, so under concurrency the CPU ran many tiny, padded forward passes.
+A MicroBatcher queues those calls instead: a worker thread takes the first
+waiting request, collects more for up to max_wait_ms (or until max_batch
+items are queued), sorts the items by token length, and runs one forward
+pass per length bucket (everything under bucket_tokens, then doublings:
+[32, 64), [64, 128), ...), so padding never more than doubles an item's
+length while short inputs still share one pass. Each caller gets its own
+slice back through a Future.
+
+With max_wait_ms <= 0 calls run inline in the caller's thread, unbatched.
+"""
+import queue, threading, time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+BATCH_SIZE_EDGES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+WAIT_MS_EDGES = (0.5, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def word_count(item: Any) -> int:
+    """Cheap token-length proxy: whitespace words of a text, or of all texts in a pair."""
+    if isinstance(item, str):
+        return len(item.split())
+    return sum(len(str(part).split()) for part in item)
+
+
+class Histogram:
+    """Counts of observations per upper bound (le), Prometheus-style; the last bucket is +inf."""
+
+    def __init__(self, edges: Sequence[float]):
+        self.edges = tuple(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.total = 0.0
+        self.n = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = next((i for i, e in enumerate(self.edges) if value <= e), len(self.edges))
+        with self._lock:
+            self.counts[i] += 1
+            self.total += value
+            self.n += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {f"le_{e:g}": c for e, c in zip(self.edges, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            return {"count": self.n, "mean": round(self.total / self.n, 3) if self.n else None,
+                    "buckets": buckets}
+
+
+class MicroBatcher:
+    """
+    Batch concurrent calls of `fn` (a list of items -> a sequence of results, one per item).
+
+    Args:
+      name: label for stats / the worker thread.
+      fn: the model call, e.g. lambda texts: model.encode(texts); looked up per batch, never cached.
+      max_batch: items per forward pass (a single larger request is split too).
+      max_wait_ms: how long the first queued request waits for company (<= 0 disables batching).
+      bucket_tokens: length (in `length` units) of the first bucket; later buckets double.
+        Items of different buckets never share a forward pass.
+      length: token-length estimate per item (default word_count).
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], Sequence[Any]], max_batch: int = 64,
+                 max_wait_ms: float = 2.0, bucket_tokens: int = 32,
+                 length: Optional[Callable[[Any], int]] = None):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_ms = float(max_wait_ms)
+        self.bucket_tokens = max(1, int(bucket_tokens))
+        self.length = length or word_count
+        self.batch_sizes = Histogram(BATCH_SIZE_EDGES)
+        self.queue_wait_ms = Histogram(WAIT_MS_EDGES)
+        self.requests = self.forward_passes = 0
+        self._q: "queue.Queue[Tuple[List[Any], Future, float]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, items: Sequence[Any]) -> List[Any]:
+        return self.submit(items).result()
+
+    def submit(self, items: Sequence[Any]) -> Future:
+        """Queue `items`; the Future resolves to their results, in order."""
+        fut: Future = Future()
+        items = list(items)
+        if not items:
+            fut.set_result([])
+            return fut
+        if self.max_wait_ms <= 0:
+            self._run([(items, fut, time.perf_counter())])
+            return fut
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._loop, name=f"batch-{self.name}", daemon=True)
+                    self._worker.start()
+        self._q.put((items, fut, time.perf_counter()))
+        return fut
+
+    def _loop(self) -> None:
+        while True:
+            first = self._q.get()
+            reqs, n = [first], len(first[0])
+            deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+            while n < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    req = self._q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                reqs.append(req)
+                n += len(req[0])
+            try:
+                self._run(reqs)
+            except BaseException as e:  # never let the worker die with callers waiting
+                for _, fut, _ in reqs:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def bucket(self, n: int) -> int:
+        """0 below bucket_tokens, then 1, 2, ... per doubling of the length."""
+        return 0 if n < self.bucket_tokens else (n // self.bucket_tokens).bit_length()
+
+    def _forward(self, items: List[Any]) -> List[Any]:
+        """Length-sorted, bucketed forward passes over `items`; results in input order."""
+        lengths = [self.length(it) for it in items]
+        order = sorted(range(len(items)), key=lambda i: lengths[i])
+        out: List[Any] = [None] * len(items)
+        start = 0
+        while start < len(order):
+            bucket = self.bucket(lengths[order[start]])
+            end = start + 1
+            while (end < len(order) and end - start < self.max_batch
+                   and self.bucket(lengths[order[end]]) == bucket):
+                end += 1
+            idx = order[start:end]
+            for i, r in zip(idx, self.fn([items[i] for i in idx])):
+                out[i] = r
+            self.batch_sizes.observe(len(idx))
+            with self._lock:
+                self.forward_passes += 1
+            start = end
+        return out
+
+    def _run(self, reqs: List[Tuple[List[Any], Future, float]]) -> None:
+        now = time.perf_counter()
+        for _, _, queued_at in reqs:
+            self.queue_wait_ms.observe((now - queued_at) * 1000.0)
+        with self._lock:
+            self.requests += len(reqs)
+        flat = [item for items, _, _ in reqs for item in items]
+        try:
+            results = self._forward(flat)
+        except Exception as e:
+            if len(reqs) == 1:
+                reqs[0][1].set_exception(e)
+                return
+            # one bad request must not fail the others: retry each on its own
+            for req in reqs:
+                try:
+                    req[1].set_result(self._forward(req[0]))
+                except Exception as e:
+                    req[1].set_exception(e)
+            return
+        pos = 0
+        for items, fut, _ in reqs:
+            fut.set_result(results[pos:pos + len(items)])
+            pos += len(items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "forward_passes": self.forward_passes,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_ms,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
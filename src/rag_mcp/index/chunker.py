@@ -1,6 +1,11 @@
 # src/rag_mcp/index/chunker.py
+import hashlib
 from typing import Dict, List, Any
 
+def content_hash(text: str) -> str:
+    """Short, stable hash of a chunk's text (keys score/embedding caches)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
 def _fees_line(p: Dict[str, Any]) -> str:
     fees = p.get("fees", {}) or {}
     parts = []
@@ -32,7 +37,7 @@ def make_chunks(p: Dict[str, Any]) -> List[Dict[str, Any]]:
     Returns a list of dicts with:
       - id: stable unique id (programme_id + section)
       - text: chunk text
-      - metadata: { programme_name, section, year?, url, last_fetched }
+      - metadata: { programme_name, section, year?, url, last_fetched, content_hash }
     """
     chunks: List[Dict[str, Any]] = []
 
@@ -94,4 +99,7 @@ def make_chunks(p: Dict[str, Any]) -> List[Dict[str, Any]]:
             }
         })
 
+    for c in chunks:
+        c["metadata"]["content_hash"] = content_hash(c["text"])
+
     return chunks
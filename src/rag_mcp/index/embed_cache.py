@@ -0,0 +1,99 @@
+# src/rag_mcp/index/embed_cache.py
+"""
+Persistent, content-addressed cache of chunk embeddings.
+
+One directory per embedding model and backend (embed_vectors_id()), so
+switching EMBED_MODEL or EMBED_BACKEND starts from an empty cache. Inside it:
+
+  vectors.f32  raw float32 rows, append-only, memory-mapped for reads
+  index.json   {"dim": d, "rows": {content_hash(text): row}}
+
+Rows are appended before index.json is rewritten (atomically), so a crash
+mid-write leaves at worst some unreferenced rows at the end of the file.
+"""
+import json, os, threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .chunker import content_hash
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+
+
+class EmbeddingCache:
+    """text -> embedding for one model, stored under `cache_dir/<model_id>`."""
+
+    def __init__(self, cache_dir: str, model_id: str):
+        self.dir = os.path.join(cache_dir, model_id)
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._mm: Optional[np.ndarray] = None
+        self.hits = self.misses = self.inserts = 0
+        try:
+            with open(os.path.join(self.dir, INDEX_FILE), encoding="utf-8") as f:
+                data = json.load(f)
+            self._rows = {str(k): int(v) for k, v in data["rows"].items()}
+            self._dim = int(data["dim"])
+        except Exception:
+            self._rows, self._dim = {}, None
+
+    def _vectors(self) -> np.ndarray:
+        if self._mm is None or len(self._mm) < len(self._rows):
+            n = max(self._rows.values()) + 1 if self._rows else 0
+            self._mm = np.memmap(os.path.join(self.dir, VECTORS_FILE), dtype=np.float32, mode="r",
+                                 shape=(n, self._dim or 0)) if n else np.zeros((0, self._dim or 0), np.float32)
+        return self._mm
+
+    def lookup(self, texts: List[str]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """({position: vector} for cached texts, positions of the misses)."""
+        found: Dict[int, np.ndarray] = {}
+        missing: List[int] = []
+        with self._lock:
+            rows = [self._rows.get(content_hash(t)) for t in texts]
+            vecs = self._vectors() if any(r is not None for r in rows) else None
+            for i, r in enumerate(rows):
+                if r is None:
+                    missing.append(i)
+                else:
+                    found[i] = np.array(vecs[r])
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def add(self, texts: List[str], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._dim is not None and vectors.shape[1] != self._dim:
+                return  # another model's vectors under this id; never mix dimensions
+            os.makedirs(self.dir, exist_ok=True)
+            new: Dict[str, int] = {}
+            keep = []
+            n = max(self._rows.values()) + 1 if self._rows else 0
+            for t, v in zip(texts, vectors):
+                h = content_hash(t)
+                if h in self._rows or h in new:
+                    continue
+                new[h] = n + len(keep)
+                keep.append(v)
+            if not keep:
+                return
+            path = os.path.join(self.dir, VECTORS_FILE)
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(n * vectors.shape[1] * 4)
+                f.truncate()  # drop rows a crashed run appended but never indexed
+                f.write(np.stack(keep).tobytes())
+            self._rows.update(new)
+            self._dim = int(vectors.shape[1])
+            self._mm = None
+            index_path = os.path.join(self.dir, INDEX_FILE)
+            with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"dim": self._dim, "rows": self._rows}, f)
+            os.replace(index_path + ".tmp", index_path)
+            self.inserts += len(keep)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "inserts": self.inserts, "entries": len(self._rows)}
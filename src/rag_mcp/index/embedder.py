@@ -1,44 +1,124 @@
-from typing import Optional
+import os
+import threading
+from typing import Dict, List, Optional
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
-from ..config import EMBED_MODEL  # make sure this points to ./models/all-MiniLM-L6-v2
+from ..config import EMBED_MODEL, EMBED_BACKEND, EMBED_BATCH_SIZE, EMBED_CACHE_DIR  # make sure this points to ./models/all-MiniLM-L6-v2
+from .embed_cache import EmbeddingCache
+from .models import get_model
 
-_embedder: Optional[SentenceTransformer] = None
+_embedder = None  # the registry's EMBED_MODEL instance, once fetched
 
 
-def get_embedder() -> SentenceTransformer:
+def get_embedder():
     """
-    Lazily load and cache the SentenceTransformer embedder.
+    The process-wide SentenceTransformer for EMBED_MODEL on EMBED_BACKEND
+    (see models.py).
 
     Strictly offline: local_files_only=True means it will only load
     from EMBED_MODEL (local folder or local HF cache) and never
     attempt to download from the internet.
     """
     global _embedder
-
-    if _embedder is not None:
-        return _embedder
-
-    try:
-        _embedder = SentenceTransformer(EMBED_MODEL, local_files_only=True)
-    except Exception as e:
-        raise RuntimeError(
-            f"[RAG] Failed to load embedder model from '{EMBED_MODEL}'. "
-            f"Make sure the folder exists and contains a valid SentenceTransformer model."
-        ) from e
-
+    if _embedder is None:
+        _embedder = get_model("embedder", EMBED_MODEL, EMBED_BACKEND)
     return _embedder
 
 
-def encode(texts, convert_to_numpy: bool = True):
+def encode(texts, convert_to_numpy: bool = True, batch_size: int = EMBED_BATCH_SIZE,
+           use_cache: bool = True):
     """
     Convenience wrapper around SentenceTransformer.encode with
     normalization turned on.
+
+    A list of texts is first looked up in the persistent embedding cache
+    (EMBED_CACHE_DIR, see embed_cache.py); only the misses are encoded, in
+    batches of `batch_size` after sorting by length so each batch pads to
+    similar lengths, and then added to the cache. Rows come back in input
+    order. When every text is cached the model is never loaded.
     """
+    if isinstance(texts, str) or not convert_to_numpy:
+        return get_embedder().encode(
+            texts,
+            normalize_embeddings=True,
+            convert_to_numpy=convert_to_numpy,
+        )
+    texts = list(texts)
+    cache = get_embed_cache() if use_cache else None
+    if cache is None:
+        return _encode_sorted(texts, batch_size)
+    found, missing = cache.lookup(texts)
+    todo = list(dict.fromkeys(texts[i] for i in missing))  # each distinct miss encoded once
+    fresh = _encode_sorted(todo, batch_size) if todo else None
+    if fresh is not None:
+        cache.add(todo, fresh)
+    dim = fresh.shape[1] if fresh is not None else (len(next(iter(found.values()))) if found else 0)
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, vec in found.items():
+        out[i] = vec
+    if fresh is not None:
+        row = {t: j for j, t in enumerate(todo)}
+        for i in missing:
+            out[i] = fresh[row[texts[i]]]
+    return out
+
+
+def _encode_sorted(texts: List[str], batch_size: int) -> np.ndarray:
     model = get_embedder()
-    return model.encode(
-        texts,
-        normalize_embeddings=True,
-        convert_to_numpy=convert_to_numpy,
-    )
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    out = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    step = max(int(batch_size), 1)
+    for start in range(0, len(order), step):
+        idx = order[start:start + step]
+        out[idx] = model.encode(
+            [texts[i] for i in idx],
+            batch_size=step,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+    return out
+
+
+# -------- persistent embedding cache --------
+_embed_cache: Optional[EmbeddingCache] = None
+_embed_cache_lock = threading.Lock()
+
+
+def get_embed_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache for EMBED_MODEL, or None when EMBED_CACHE_DIR is empty."""
+    global _embed_cache
+    if not EMBED_CACHE_DIR:
+        return None
+    if _embed_cache is None:
+        with _embed_cache_lock:
+            if _embed_cache is None:
+                _embed_cache = EmbeddingCache(EMBED_CACHE_DIR, embed_vectors_id())
+    return _embed_cache
+
+
+def embed_cache_stats() -> Dict[str, int]:
+    cache = get_embed_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def embed_model_id(model: str = EMBED_MODEL) -> str:
+    """
+    Stable identifier for an embedding model, independent of where the
+    local folder lives (e.g. 'all-MiniLM-L6-v2' for ./models/all-MiniLM-L6-v2).
+    Recorded in the index marker so query and index vectors can be checked
+    to come from the same model.
+    """
+    return os.path.basename(os.path.normpath(model))
+
+
+def embed_vectors_id(model: str = EMBED_MODEL, backend: str = EMBED_BACKEND) -> str:
+    """
+    embed_model_id() plus the inference backend unless it is torch
+    ('all-MiniLM-L6-v2@onnx-int8'): quantized vectors differ slightly from
+    float32 ones, so the embedding cache, the manifest and the index marker
+    use this to keep them from being mixed. Plain torch keeps the bare id,
+    so existing indexes stay valid.
+    """
+    mid = embed_model_id(model)
+    return mid if backend == "torch" else f"{mid}@{backend}"
@@ -0,0 +1,47 @@
+# src/rag_mcp/index/facts.py
+"""
+In-memory programme fact table (fees, duration, intakes).
+
+Built from the same programme JSON the chunker consumes, so the fees chunk
+it hands back is byte-identical to the one stored in the index.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from .chunker import make_chunks
+
+
+def build_fact_table(programmes) -> Dict[str, Dict[str, Any]]:
+    """
+    programme_name -> {"fees", "duration", "intakes", "fees_chunk"}.
+
+    fees_chunk is the programme's "#fees" chunk exactly as make_chunks()
+    produces it (id, text, metadata).
+    """
+    table: Dict[str, Dict[str, Any]] = {}
+    for p in programmes:
+        name = (p.get("programme_name") or "").strip()
+        if not name or name in table:
+            continue
+        fees_chunk = next((c for c in make_chunks(p) if c["metadata"]["section"] == "fees"), None)
+        if fees_chunk is None:
+            continue
+        table[name] = {
+            "fees": p.get("fees") or {},
+            "duration": p.get("duration") or "",
+            "intakes": list(p.get("intakes") or []),
+            "fees_chunk": fees_chunk,
+        }
+    return table
+
+
+def load_fact_table(json_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Fact table for every readable *.json programme record in json_dir."""
+    programmes = []
+    for fp in sorted(Path(json_dir).glob("*.json")):
+        try:
+            programmes.append(json.loads(fp.read_text(encoding="utf-8")))
+        except Exception:
+            continue
+    return build_fact_table(programmes)
@@ -0,0 +1,141 @@
+# src/rag_mcp/index/manifest.py
+"""
+Index manifest: what build_index.py last wrote for every programme.
+
+Stored next to the index as index_manifest.json:
+
+  {"embed_model": "...",
+   "programmes": {programme_id: {"source_hash": ..., "fingerprint": ..., "chunk_ids": [...]}}}
+
+plan_build() compares it with the current programme records so a rebuild
+only embeds and upserts programmes whose content (source_hash) or chunk
+output (fingerprint, which also catches chunker template changes but
+ignores the fetch date) moved, and deletes chunk ids that no longer exist.
+"""
+import hashlib, json, os
+from typing import Any, Dict, List, Tuple
+
+from .chunker import make_chunks
+
+MANIFEST_FILE = "index_manifest.json"
+
+
+def load_manifest(persist_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(persist_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            m = json.load(f)
+        if isinstance(m, dict) and isinstance(m.get("programmes"), dict):
+            return m
+    except Exception:
+        pass
+    return {"embed_model": None, "programmes": {}}
+
+
+def save_manifest(persist_dir: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# per-chunk metadata that records when a page was fetched, not what it says
+VOLATILE_METADATA = ("last_fetched",)
+
+
+def chunks_fingerprint(chunks: List[Dict[str, Any]]) -> str:
+    # without last_fetched, re-fetching an unchanged page on a new day stays a no-op
+    data = json.dumps([[c["id"], c["text"], {k: v for k, v in c["metadata"].items() if k not in VOLATILE_METADATA}]
+                       for c in chunks], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class BuildPlanner:
+    """
+    Incremental form of plan_build(): feed programmes one at a time with
+    add() (as a streaming pipeline produces them), then call finish().
+    Arguments are as for plan_build().
+    """
+
+    def __init__(self, manifest: Dict[str, Any], embed_model: str, full: bool = False, partial: bool = False):
+        built_with = manifest.get("embed_model")
+        if partial and manifest.get("programmes") and built_with != embed_model:
+            # the untouched programmes would keep built_with vectors under a manifest / marker
+            # claiming embed_model: a mixed-model index the server's model check cannot detect
+            raise RuntimeError(
+                f"[RAG] The index was built with embed model '{built_with}' but EMBED_MODEL is "
+                f"'{embed_model}'. A partial build (--only, or a --glob subset) cannot switch models; rebuild every programme."
+            )
+        self.manifest = manifest
+        self.embed_model = embed_model
+        self.partial = partial
+        self._old = manifest.get("programmes", {}) if manifest.get("embed_model") == embed_model and not full else {}
+        self._known_ids = {i for e in manifest.get("programmes", {}).values() for i in e.get("chunk_ids", [])}
+        self._entries: Dict[str, Any] = dict(manifest.get("programmes", {})) if partial else {}
+        self._seen = set()
+        self.counts = {"added": 0, "updated": 0, "removed": 0,
+                       "programmes_changed": 0, "programmes_unchanged": 0, "programmes_removed": 0}
+
+    def add(self, p: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """(chunks to upsert, chunk ids to delete) for one programme; both empty when unchanged."""
+        pid = p["id"]
+        self._seen.add(pid)
+        chunks = make_chunks(p)
+        entry = {
+            "source_hash": p.get("source_hash"),
+            "fingerprint": chunks_fingerprint(chunks),
+            "chunk_ids": [c["id"] for c in chunks],
+        }
+        prev = self._old.get(pid)
+        self._entries[pid] = entry
+        if prev and prev.get("source_hash") == entry["source_hash"] and prev.get("fingerprint") == entry["fingerprint"]:
+            self.counts["programmes_unchanged"] += 1
+            return [], []
+        self.counts["programmes_changed"] += 1
+        for c in chunks:
+            self.counts["updated" if c["id"] in self._known_ids else "added"] += 1
+        prev_ids = (self.manifest.get("programmes", {}).get(pid) or {}).get("chunk_ids", [])
+        gone = sorted(set(prev_ids) - set(entry["chunk_ids"]))
+        self.counts["removed"] += len(gone)
+        return chunks, gone
+
+    def finish(self) -> Tuple[List[str], Dict[str, Any]]:
+        """(chunk ids of programmes that disappeared, new manifest)."""
+        delete: List[str] = []
+        if not self.partial:
+            for pid, entry in self.manifest.get("programmes", {}).items():
+                if pid not in self._seen:
+                    self.counts["programmes_removed"] += 1
+                    delete.extend(entry.get("chunk_ids", []))
+        self.counts["removed"] += len(delete)
+        return delete, {"embed_model": self.embed_model, "programmes": self._entries}
+
+
+def plan_build(manifest: Dict[str, Any], programmes: List[Dict[str, Any]], embed_model: str,
+               full: bool = False, partial: bool = False) -> Tuple[List[Dict[str, Any]], List[str], Dict[str, Any], Dict[str, int]]:
+    """
+    Work out an incremental build.
+
+    Args:
+      manifest: the previous manifest (load_manifest()).
+      programmes: current programme records.
+      embed_model: id of what the new vectors will come from (embedder.embed_vectors_id():
+        model, plus backend unless torch); a different one than the manifest's forces
+        every programme to be rebuilt.
+      full: rebuild every programme regardless of hashes.
+      partial: `programmes` is a subset (--only); programmes missing from it
+        are left alone instead of being treated as removed. Refused (RuntimeError)
+        when the manifest was built with another embed model.
+
+    Returns:
+      (chunks_to_upsert, ids_to_delete, new_manifest, counts) where counts has
+      added / updated / removed chunk ids and programmes changed / unchanged / removed.
+    """
+    planner = BuildPlanner(manifest, embed_model, full=full, partial=partial)
+    upsert: List[Dict[str, Any]] = []
+    delete: List[str] = []
+    for p in programmes:
+        chunks, gone = planner.add(p)
+        upsert.extend(chunks)
+        delete.extend(gone)
+    removed, new_manifest = planner.finish()
+    return upsert, delete + removed, new_manifest, planner.counts
@@ -0,0 +1,205 @@
+# src/rag_mcp/index/models.py
+"""
+Process-wide registry of the transformer models (embedder, reranker).
+
+Every SentenceTransformer / CrossEncoder in the process comes from
+get_model(), so one (kind, path) is loaded at most once however many code
+paths use it (tools.py routing, index/embedder.py, index/reranker.py).
+Loading is lazy and lock-protected per model; torch's intra-op / inter-op
+thread counts are applied once, before the first model loads
+(MODEL_THREADS / MODEL_INTEROP_THREADS, 0 = the runtime's default; ONNX
+Runtime sessions get the same counts).
+
+Each model runs on an inference backend: "torch" (float32), "onnx", or
+"onnx-int8" (dynamically quantized to int8 weights for ONNX Runtime on
+CPU). ONNX files are exported from the local weights on first use and
+cached next to them (<model dir>/onnx/model.onnx, model_qint8_<cfg>.onnx),
+so later loads read only local files.
+
+model_stats() reports, per loaded model, its weight bytes and the RSS
+growth seen while loading it.
+"""
+import glob, os, shutil, tempfile, threading, time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import MODEL_THREADS, MODEL_INTEROP_THREADS, ONNX_QUANT_CONFIG
+
+KINDS = ("embedder", "reranker")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_models: Dict[Tuple[str, str, str], Any] = {}
+_info: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+_registry_lock = threading.Lock()
+_threads: Optional[Dict[str, int]] = None
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (0 where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def configure_threads(intra_op: int = MODEL_THREADS, inter_op: int = MODEL_INTEROP_THREADS) -> Dict[str, int]:
+    """Apply torch thread settings once per process; returns the effective counts."""
+    global _threads
+    with _registry_lock:
+        if _threads is None:
+            import torch
+            if intra_op > 0:
+                torch.set_num_threads(intra_op)
+            if inter_op > 0:
+                try:
+                    torch.set_num_interop_threads(inter_op)
+                except RuntimeError:
+                    pass  # already fixed by earlier parallel work; keep torch's value
+            _threads = {"intra_op": torch.get_num_threads(), "inter_op": torch.get_num_interop_threads()}
+    return _threads
+
+
+def _model_class(kind: str):
+    if kind == "embedder":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer
+    try:
+        from sentence_transformers.cross_encoder import CrossEncoder
+    except Exception as e:
+        raise RuntimeError(
+            "[RAG] sentence-transformers CrossEncoder is not available. "
+            "Install sentence-transformers with cross-encoder support."
+        ) from e
+    return CrossEncoder
+
+
+def onnx_file(backend: str, quant: str = ONNX_QUANT_CONFIG) -> Optional[str]:
+    """Model file for `backend`, relative to the model folder (None for torch)."""
+    if backend == "torch":
+        return None
+    if backend == "onnx":
+        return os.path.join("onnx", "model.onnx")
+    if backend == "onnx-int8":
+        return os.path.join("onnx", f"model_qint8_{quant}.onnx")
+    raise ValueError(f"[RAG] Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)}).")
+
+
+def ensure_onnx(kind: str, path: str, backend: str, quant: str = ONNX_QUANT_CONFIG) -> str:
+    """
+    Export the local model at `path` to ONNX (then int8 for "onnx-int8")
+    unless already cached under <path>/onnx/; returns the file name to load.
+    Exporting needs optimum[onnxruntime]; loading a cached file does not.
+    """
+    name = onnx_file(backend, quant)
+    base = onnx_file("onnx")
+    cls = _model_class(kind)
+    try:
+        if not os.path.exists(os.path.join(path, base)):
+            # sentence-transformers converts the torch weights when asked for a missing ONNX file
+            tmp = tempfile.mkdtemp(prefix=".onnx_export_", dir=path)
+            try:
+                cls(path, backend="onnx", local_files_only=True).save_pretrained(tmp)
+                exported = glob.glob(os.path.join(tmp, "**", "model.onnx"), recursive=True)
+                if not exported:
+                    raise RuntimeError(f"export wrote no model.onnx under {tmp}")
+                os.makedirs(os.path.join(path, "onnx"), exist_ok=True)
+                os.replace(exported[0], os.path.join(path, base))
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        if name != base and not os.path.exists(os.path.join(path, name)):
+            from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+            model = cls(path, backend="onnx", local_files_only=True, model_kwargs={"file_name": base})
+            export_dynamic_quantized_onnx_model(model, quant, path, file_suffix=f"qint8_{quant}")
+    except Exception as e:
+        raise RuntimeError(
+            f"[RAG] Failed to export '{path}' to ONNX ({backend}). "
+            f"Install optimum[onnxruntime] (pip install sentence-transformers[onnx]) or use the torch backend."
+        ) from e
+    return name
+
+
+def load_model(kind: str, path: str, backend: str = "torch"):
+    """A fresh, unshared instance (benchmarks compare backends side by side); use get_model() elsewhere."""
+    cls = _model_class(kind)
+    kwargs: Dict[str, Any] = {"local_files_only": True}
+    if backend != "torch":
+        model_kwargs: Dict[str, Any] = {"file_name": ensure_onnx(kind, path, backend),
+                                        "provider": "CPUExecutionProvider"}
+        if MODEL_THREADS > 0 or MODEL_INTEROP_THREADS > 0:
+            import onnxruntime as ort
+            opts = ort.SessionOptions()
+            opts.intra_op_num_threads = max(MODEL_THREADS, 0)
+            opts.inter_op_num_threads = max(MODEL_INTEROP_THREADS, 0)
+            model_kwargs["session_options"] = opts
+        kwargs.update(backend="onnx", model_kwargs=model_kwargs)
+    try:
+        return cls(path, **kwargs)
+    except Exception as e:
+        what = "SentenceTransformer" if kind == "embedder" else "CrossEncoder"
+        raise RuntimeError(
+            f"[RAG] Failed to load {kind} model from '{path}' ({backend} backend). "
+            f"Make sure the folder exists and contains a valid {what} model "
+            f"(e.g. models/{'all-MiniLM-L6-v2' if kind == 'embedder' else 'ms-marco-MiniLM-L6-v2'})."
+        ) from e
+
+
+_LOADERS: Dict[str, Callable[[str, str], Any]] = {
+    "embedder": lambda path, backend: load_model("embedder", path, backend),
+    "reranker": lambda path, backend: load_model("reranker", path, backend),
+}
+
+
+def _weight_bytes(model: Any, path: str, backend: str) -> int:
+    """Bytes held by parameters + buffers of the torch module(s), or the ONNX file size."""
+    if backend != "torch":
+        return os.path.getsize(os.path.join(path, onnx_file(backend)))
+    module = model if hasattr(model, "parameters") else getattr(model, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in module.parameters())
+    return total + sum(b.numel() * b.element_size() for b in module.buffers())
+
+
+def get_model(kind: str, path: str, backend: str = "torch"):
+    """The shared `kind` model loaded from `path` (offline only) on `backend`, loading it on first use."""
+    if kind not in _LOADERS:
+        raise ValueError(f"[RAG] Unknown model kind '{kind}' (expected one of {', '.join(KINDS)}).")
+    if backend not in BACKENDS:
+        raise ValueError(f"[RAG] Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)}).")
+    key = (kind, os.path.normpath(path), backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        model = _models.get(key)
+        if model is None:
+            configure_threads()
+            rss0, t0 = _rss_bytes(), time.perf_counter()
+            model = _LOADERS[kind](path, backend)
+            _info[key] = {
+                "kind": kind,
+                "model": os.path.basename(key[1]),
+                "path": path,
+                "backend": backend,
+                "load_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+                "weight_bytes": _weight_bytes(model, path, backend),
+                "rss_delta_bytes": max(_rss_bytes() - rss0, 0),
+            }
+            _models[key] = model
+    return model
+
+
+def loaded() -> Dict[Tuple[str, str, str], Any]:
+    return dict(_models)
+
+
+def model_stats() -> Dict[str, Any]:
+    """Per-model memory and load time, plus process RSS and thread settings (loads nothing)."""
+    return {
+        "models": [dict(v) for v in _info.values()],
+        "rss_bytes": _rss_bytes(),
+        "threads": dict(_threads) if _threads is not None else None,
+    }
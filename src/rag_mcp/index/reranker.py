@@ -1,21 +1,26 @@
 # src/rag_mcp/index/reranker.py
 
-from typing import List, Dict, Any, Optional
+import atexit
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 
-try:
-    from sentence_transformers.cross_encoder import CrossEncoder
-except Exception:
-    # CrossEncoder not available (package missing or import error)
-    CrossEncoder = None  # type: ignore[assignment]
+from ..config import (RERANK_MODEL, RERANK_BACKEND, RERANK_CACHE_MAX_BYTES, RERANK_CACHE_PATH,
+                      RERANK_POLICY, RERANK_SKIP_MARGIN, RERANK_BUDGET_MS,
+                      BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, BATCH_BUCKET_TOKENS)
+from ..cache import LRUCache, normalize_query
+from .batching import MicroBatcher
+from .chunker import content_hash
+from .models import get_model
 
-from ..config import RERANK_MODEL
+_rerank_model = None  # the registry's CrossEncoder, once fetched
 
-_rerank_model: Optional["CrossEncoder"] = None  # type: ignore[name-defined]
 
-
-def get_reranker(model_name: Optional[str] = None) -> "CrossEncoder":
+def get_reranker(model_name: Optional[str] = None):
     """
-    Lazily create and cache a CrossEncoder for reranking.
+    The process-wide CrossEncoder for reranking, on RERANK_BACKEND
+    (see models.py).
 
     Strictly offline:
       - Uses local_files_only=True, so it will only load from a local folder
@@ -26,34 +31,116 @@ def get_reranker(model_name: Optional[str] = None) -> "CrossEncoder":
       cannot be loaded.
     """
     global _rerank_model
+    if model_name and model_name != RERANK_MODEL:
+        return get_model("reranker", model_name, RERANK_BACKEND)
+    if _rerank_model is None:
+        _rerank_model = get_model("reranker", RERANK_MODEL, RERANK_BACKEND)
+    return _rerank_model
 
-    if _rerank_model is not None:
-        return _rerank_model
 
-    if CrossEncoder is None:
-        raise RuntimeError(
-            "[RAG] sentence-transformers CrossEncoder is not available. "
-            "Install sentence-transformers with cross-encoder support."
-        )
+# -------- score cache --------
+_score_cache: Optional[LRUCache] = None
+_score_cache_lock = threading.Lock()
 
-    name = model_name or RERANK_MODEL
 
-    try:
-        _rerank_model = CrossEncoder(name, local_files_only=True)
-    except Exception as e:
-        raise RuntimeError(
-            f"[RAG] Failed to load reranker model from '{name}'. "
-            f"Make sure the folder exists and contains a valid CrossEncoder model "
-            f"(e.g. models/ms-marco-MiniLM-L6-v2)."
-        ) from e
+def _get_score_cache() -> LRUCache:
+    """
+    Process-wide (reranker, normalized query, chunk hash) -> score cache.
+
+    With RERANK_CACHE_PATH set, it is loaded from that file on first use
+    and written back at interpreter exit, so a restarted server starts warm.
+    """
+    global _score_cache
+    if _score_cache is not None:
+        return _score_cache
+    with _score_cache_lock:
+        if _score_cache is None:
+            cache = LRUCache(RERANK_CACHE_MAX_BYTES)
+            if RERANK_CACHE_PATH:
+                cache.load(RERANK_CACHE_PATH)
+                atexit.register(save_score_cache)
+            _score_cache = cache
+    return _score_cache
+
+
+def save_score_cache(path: Optional[str] = None) -> int:
+    """Persist the score cache to `path` (default RERANK_CACHE_PATH); returns entries written."""
+    path = path or RERANK_CACHE_PATH
+    if not path or _score_cache is None:
+        return 0
+    return _score_cache.save(path)
+
+
+def score_cache_stats() -> Dict[str, int]:
+    return _get_score_cache().stats()
+
+
+def _scorer_id() -> str:
+    """'<model folder>@<backend>': scores of another model or precision never share entries."""
+    return f"{os.path.basename(os.path.normpath(RERANK_MODEL))}@{RERANK_BACKEND}"
+
+
+def _pair_key(qkey: str, cand: Dict[str, Any]) -> str:
+    h = (cand.get("metadata") or {}).get("content_hash") or content_hash(cand["text"])
+    return f"{_scorer_id()}\x1f{qkey}\x1f{h}"
+
+
+# concurrent searches share CrossEncoder forward passes (see batching.py)
+_PREDICT_BATCHER = MicroBatcher("rerank", lambda pairs: get_reranker().predict(pairs),
+                                max_batch=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+                                bucket_tokens=BATCH_BUCKET_TOKENS)
+
+
+def rerank_batching_stats() -> Dict[str, Any]:
+    return _PREDICT_BATCHER.stats()
 
-    return _rerank_model
+
+def _score_many(items: List[Tuple[str, List[Dict[str, Any]]]]) -> List[int]:
+    """
+    Set "_score_rerank" on every candidate of every (query, candidates) item.
+
+    Cached pairs are filled in first; all remaining pairs, across all
+    queries, go to model.predict as one request to the micro-batcher (which
+    may share forward passes with concurrent searches). Returns, per item,
+    how many pairs the model actually scored.
+    """
+    cache = _get_score_cache()
+    todo: List[Tuple[int, Dict[str, Any], str]] = []  # (item, candidate, cache key)
+    scored = [0] * len(items)
+    for n, (query, candidates) in enumerate(items):
+        qkey = normalize_query(query)
+        for c in candidates:
+            key = _pair_key(qkey, c)
+            s = cache.get(key)
+            if s is None:
+                todo.append((n, c, key))
+            else:
+                c["_score_rerank"] = float(s)
+
+    if todo:
+        get_reranker()  # load outside the timed section
+        t0 = time.perf_counter()
+        fresh = _PREDICT_BATCHER([(items[n][0], c["text"]) for n, c, _ in todo])
+        _observe_pair_cost((time.perf_counter() - t0) * 1000.0 / len(todo))
+        for (n, c, key), s in zip(todo, fresh):
+            c["_score_rerank"] = float(s)
+            cache.put(key, float(s))
+            scored[n] += 1
+    return scored
+
+
+def _score(query: str, candidates: List[Dict[str, Any]]) -> int:
+    return _score_many([(query, candidates)])[0]
 
 
 def rerank(query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Rerank candidates by relevance to the query using the CrossEncoder.
 
+    Scores are cached per (normalized query, chunk text hash); only pairs
+    not seen before go to model.predict, as one partial batch. When every
+    pair is cached the model is not even loaded.
+
     Args:
       query: User query string.
       candidates: List of docs with at least a "text" field:
@@ -66,12 +153,83 @@ def rerank(query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]
     if not candidates:
         return candidates
 
-    model = get_reranker()
+    _score(query, candidates)
+    return sorted(candidates, key=lambda x: x["_score_rerank"], reverse=True)
 
-    pairs = [[query, c["text"]] for c in candidates]
-    scores = model.predict(pairs)
 
-    for c, s in zip(candidates, scores):
-        c["_score_rerank"] = float(s)
+# -------- adaptive policy --------
+_pair_ms: Optional[float] = None  # EWMA of CrossEncoder cost per pair, in ms
+_pair_ms_lock = threading.Lock()
 
-    return sorted(candidates, key=lambda x: x["_score_rerank"], reverse=True)
+
+def _observe_pair_cost(ms: float) -> None:
+    global _pair_ms
+    with _pair_ms_lock:
+        _pair_ms = ms if _pair_ms is None else 0.8 * _pair_ms + 0.2 * ms
+
+
+def plan_rerank(candidates: List[Dict[str, Any]], top_k: int, confident: bool = False) -> Tuple[int, str]:
+    """
+    Decide how many of the (dense-ordered) candidates to rerank.
+
+    Returns (n, reason). n == 0 means skip: a single candidate, a routing
+    decision the caller is confident in, or a top dense score ahead of the
+    runner-up by at least RERANK_SKIP_MARGIN. Otherwise n is every
+    candidate, or, with RERANK_BUDGET_MS set and a per-pair cost already
+    measured, as many as fit in the budget (never fewer than top_k).
+    """
+    n = len(candidates)
+    if RERANK_POLICY != "adaptive":
+        return n, "always"
+    if n <= 1:
+        return 0, "single_candidate"
+    if confident:
+        return 0, "confident_route"
+    scores = sorted((float(c.get("score", 0.0)) for c in candidates), reverse=True)
+    if scores[0] - scores[1] >= RERANK_SKIP_MARGIN:
+        return 0, "dense_margin"
+    if RERANK_BUDGET_MS > 0 and _pair_ms:
+        fit = int(RERANK_BUDGET_MS / _pair_ms)
+        if fit < n:
+            return max(min(top_k, n), fit), "budget"
+    return n, "full"
+
+
+def adaptive_rerank_batch(
+    requests: List[Tuple[str, List[Dict[str, Any]], int, bool]],
+) -> List[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    adaptive_rerank() for many (query, candidates, top_k, confident) requests,
+    with every pair that needs the model scored in a single predict batch.
+    """
+    planned = []
+    for query, candidates, top_k, confident in requests:
+        ordered = sorted(candidates, key=lambda c: float(c.get("score", 0.0)), reverse=True)
+        n, reason = plan_rerank(ordered, top_k, confident)
+        planned.append((query, ordered, n, {"ran": n > 0, "reason": reason, "pairs": n, "pairs_scored": 0}))
+
+    work = [(query, ordered[:n]) for query, ordered, n, _ in planned if n > 0]
+    counts = iter(_score_many(work)) if work else iter(())
+
+    out = []
+    for query, ordered, n, info in planned:
+        if n == 0:
+            out.append((ordered, info))
+            continue
+        info["pairs_scored"] = next(counts)
+        head = sorted(ordered[:n], key=lambda x: x["_score_rerank"], reverse=True)
+        out.append((head + ordered[n:], info))
+    return out
+
+
+def adaptive_rerank(query: str, candidates: List[Dict[str, Any]], top_k: int,
+                    confident: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    rerank() under plan_rerank(): skip it, or rerank only the top-N dense
+    candidates and keep the remainder after them in dense order.
+
+    Returns (candidates, info) where info reports for this request whether
+    reranking ran, why, how many pairs were considered and how many the
+    model actually scored.
+    """
+    return adaptive_rerank_batch([(query, candidates, top_k, confident)])[0]
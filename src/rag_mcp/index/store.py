@@ -0,0 +1,186 @@
+# src/rag_mcp/index/store.py
+"""
+Vector store plumbing shared by the backends.
+
+A backend collection (Chroma's, or index/store_exact.ExactCollection)
+exposes the subset of the Chroma collection API the code relies on:
+
+  query(query_embeddings=[[...], ...], n_results=int, include=[...], where=dict|None)
+  get(ids=[...], include=[...])
+  count()
+  upsert(ids=[...], documents=[...], metadatas=[...], embeddings=[...])
+  delete(ids=[...])
+
+with Chroma-shaped return values ({"ids": [[...]], "documents": [[...]], ...}).
+`where` uses the {"field": {"$eq": v}} / {"$and": [...]} forms built by tools._where.
+"""
+import json, os, threading, time, uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import VECTOR_BACKEND, CHROMA_DIR, EXACT_DIR, COLLECTION
+
+def upsert_chunks(client, collection, chunks: List[Dict], embeddings=None, batch_size: int = 0) -> int:
+    """
+    Upsert chunks in bulk calls of at most `batch_size` (0 = one call; Chroma's
+    own max batch size always caps it). Without `embeddings` the chunks are
+    embedded with index/embedder.encode(). Returns the number of upsert() calls.
+    """
+    limit = getattr(client, "get_max_batch_size", None) if client is not None else None
+    size = batch_size if batch_size > 0 else len(chunks)
+    if limit is not None:
+        size = min(size, limit())
+    calls = 0
+    for start in range(0, len(chunks), max(size, 1)):
+        part = chunks[start:start + size]
+        ids = [c["id"] for c in part]
+        docs = [c["text"] for c in part]
+        metas = [c["metadata"] for c in part]
+        if embeddings is None:
+            # embed with the shared EMBED_MODEL, never Chroma's own default embedding model
+            from .embedder import encode
+            vectors = encode(docs)
+        else:
+            vectors = embeddings[start:start + size]
+        collection.upsert(ids=ids, documents=docs, metadatas=metas, embeddings=vectors)
+        calls += 1
+    # Chroma's PersistentClient persists on write; an ExactCollection still needs save()
+    return calls
+
+# -------- index version marker --------
+# Written next to the index by build_index.py after every (re)build.
+INDEX_VERSION_FILE = "index_version.json"
+
+def write_index_version(persist_dir: str, **info: Any) -> str:
+    """
+    Stamp the on-disk index with a fresh version id so long-running servers
+    know to reopen it. Extra keyword args are stored alongside for humans.
+    """
+    version = uuid.uuid4().hex
+    payload = {"version": version, "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **info}
+    path = os.path.join(persist_dir, INDEX_VERSION_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)  # atomic: readers never see a half-written marker
+    return version
+
+def read_index_info(persist_dir: str) -> Dict[str, Any]:
+    """Contents of the version marker ({} if the index predates it)."""
+    path = os.path.join(persist_dir, INDEX_VERSION_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            info = json.load(f)
+        return info if isinstance(info, dict) else {}
+    except Exception:
+        return {}
+
+def read_index_version(persist_dir: str) -> str:
+    """
+    Current index version: the id from the marker file, or the sqlite mtime
+    for indexes built before the marker existed.
+    """
+    version = read_index_info(persist_dir).get("version")
+    if version:
+        return str(version)
+    try:
+        return f"mtime:{os.stat(os.path.join(persist_dir, 'chroma.sqlite3')).st_mtime_ns}"
+    except OSError:
+        return "empty"
+
+class SharedIndex(ABC):
+    """
+    Process-wide handle on a backend collection.
+
+    The collection is opened once and reused by every call (from any thread).
+    Each get() only stats the version marker; the collection is reopened when
+    build_index.py has stamped a new version. Backends implement _open().
+    """
+
+    # stat()ed instead of the marker for indexes built before it existed
+    fallback_file = INDEX_VERSION_FILE
+
+    def __init__(self, persist_dir: str, name: str):
+        self.persist_dir = persist_dir
+        self.name = name
+        self._lock = threading.Lock()
+        self._col = None
+        self._version: Optional[str] = None
+        self._info: Dict[str, Any] = {}
+        self._count: Optional[int] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    def _marker_stamp(self) -> Tuple[int, int]:
+        for fname in (INDEX_VERSION_FILE, self.fallback_file):
+            try:
+                st = os.stat(os.path.join(self.persist_dir, fname))
+                return (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return (0, 0)
+
+    def get(self):
+        stamp = self._marker_stamp()
+        col = self._col
+        if col is not None and stamp == self._stamp:
+            return col
+        with self._lock:
+            if self._col is not None and stamp == self._stamp:
+                return self._col
+            version = read_index_version(self.persist_dir)
+            self._info = read_index_info(self.persist_dir)
+            if self._col is None or version != self._version:
+                self._col = self._open(reopening=self._col is not None)
+                self._version = version
+                self._count = None
+            self._stamp = stamp
+            return self._col
+
+    @abstractmethod
+    def _open(self, reopening: bool):
+        """The backend collection; `reopening` is True when replacing an older version."""
+
+    def count(self) -> int:
+        """Number of stored chunks; cached until the index version changes."""
+        col = self.get()
+        n = self._count
+        if n is None:
+            n = self._count = col.count()
+        return n
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version of the index the open handle points at (None until first get())."""
+        return self._version
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """Marker contents (embed_model, counts, ...) for the open index."""
+        return self._info
+
+
+def index_dir(backend: str = VECTOR_BACKEND) -> str:
+    """Directory holding the index (and its marker/aliases) for a backend."""
+    return EXACT_DIR if backend == "exact" else CHROMA_DIR
+
+
+def shared_index(backend: str = VECTOR_BACKEND, name: str = COLLECTION) -> SharedIndex:
+    """SharedIndex for the configured backend ("chroma" or "exact")."""
+    if backend == "exact":
+        from .store_exact import SharedExactCollection
+        return SharedExactCollection(EXACT_DIR, name)
+    if backend == "chroma":
+        from .store_chroma import SharedCollection
+        return SharedCollection(CHROMA_DIR, name)
+    raise ValueError(f"[RAG] Unknown VECTOR_BACKEND '{backend}' (expected 'chroma' or 'exact').")
+
+
+def open_for_build(backend: str = VECTOR_BACKEND, name: str = COLLECTION):
+    """(client, collection) to write a backend's index; an exact collection needs save() afterwards."""
+    if backend == "exact":
+        from .store_exact import ExactCollection
+        return None, ExactCollection.load(EXACT_DIR)
+    if backend == "chroma":
+        from .store_chroma import get_collection
+        return get_collection(CHROMA_DIR, name)
+    raise ValueError(f"[RAG] Unknown VECTOR_BACKEND '{backend}' (expected 'chroma' or 'exact').")
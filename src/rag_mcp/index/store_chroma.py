@@ -2,15 +2,23 @@ import chromadb
 from chromadb.config import Settings
 from typing import List, Dict
 
+from .store import (INDEX_VERSION_FILE, SharedIndex, upsert_chunks,  # re-exported for existing callers
+                    write_index_version, read_index_info, read_index_version)
+
 def get_collection(persist_dir: str, name: str):
     client = chromadb.PersistentClient(path=persist_dir, settings=Settings(allow_reset=False))
     col = client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
     return client, col
 
-def upsert_chunks(client, collection, chunks: List[Dict]):
-    ids = [c["id"] for c in chunks]
-    docs = [c["text"] for c in chunks]
-    metas = [c["metadata"] for c in chunks]
-    # embeddings computed client-side by embedder when bulk indexing; for demo, let Chroma compute later if needed
-    collection.upsert(ids=ids, documents=docs, metadatas=metas)
-    # Persist handled by PersistentClient; nothing else required
+class SharedCollection(SharedIndex):
+    """Process-wide Chroma collection handle (see SharedIndex)."""
+
+    fallback_file = "chroma.sqlite3"
+
+    def _open(self, reopening: bool):
+        if reopening:
+            # drop chromadb's per-path system cache so the rebuilt segments are loaded
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        _, col = get_collection(self.persist_dir, self.name)
+        return col
@@ -0,0 +1,177 @@
+# src/rag_mcp/index/store_exact.py
+"""
+Exact in-memory vector backend.
+
+The corpus is a few hundred chunks, so a brute-force matrix-vector product
+beats an ANN index on latency and is exact by construction. Chunk
+embeddings live in one contiguous matrix (embeddings.npy, memory-mapped
+when stored as float32); ids, documents and metadata are stored columnar
+in chunks.json. Filters are boolean masks over the metadata columns.
+"""
+import json, os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .store import SharedIndex
+
+EMB_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.json"
+
+
+class ExactCollection:
+    """Chroma-compatible collection (see index/store.py) over a dense matrix."""
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                 embeddings: Optional[np.ndarray] = None):
+        self._ids = list(ids)
+        self._docs = list(documents)
+        self._metas = [dict(m or {}) for m in metadatas]
+        dim = embeddings.shape[1] if embeddings is not None and embeddings.ndim == 2 else 0
+        self._emb = embeddings if embeddings is not None else np.zeros((0, dim), dtype=np.float32)
+        self._pos = {id_: i for i, id_ in enumerate(self._ids)}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    # -------- persistence --------
+    @classmethod
+    def load(cls, persist_dir: str) -> "ExactCollection":
+        """Open a saved collection (an empty one if nothing was saved yet)."""
+        emb_path = os.path.join(persist_dir, EMB_FILE)
+        chunks_path = os.path.join(persist_dir, CHUNKS_FILE)
+        if not (os.path.exists(emb_path) and os.path.exists(chunks_path)):
+            return cls([], [], [])
+        with open(chunks_path, encoding="utf-8") as f:
+            data = json.load(f)
+        emb = np.load(emb_path, mmap_mode="r")
+        if emb.dtype != np.float32:
+            emb = emb.astype(np.float32)  # float16 on disk: upcast once, matmul in float32
+        ids = data["ids"]
+        cols = data.get("metadata") or {}
+        metas = [{k: v[i] for k, v in cols.items() if v[i] is not None} for i in range(len(ids))]
+        return cls(ids, data["documents"], metas, emb)
+
+    def save(self, persist_dir: str, dtype: str = "float32") -> None:
+        """Write embeddings + columnar metadata atomically (readers see old or new, never half)."""
+        os.makedirs(persist_dir, exist_ok=True)
+        fields = sorted({k for m in self._metas for k in m})
+        data = {
+            "ids": self._ids,
+            "documents": self._docs,
+            "metadata": {k: [m.get(k) for m in self._metas] for k in fields},
+        }
+        emb_path = os.path.join(persist_dir, EMB_FILE)
+        chunks_path = os.path.join(persist_dir, CHUNKS_FILE)
+        with open(emb_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self._emb, dtype=np.dtype(dtype)))
+        with open(chunks_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(emb_path + ".tmp", emb_path)
+        os.replace(chunks_path + ".tmp", chunks_path)
+
+    # -------- collection API --------
+    def count(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+               embeddings=None) -> None:
+        if embeddings is None:
+            raise ValueError("[RAG] The exact backend stores client-side embeddings only; pass embeddings=.")
+        new = np.asarray(embeddings, dtype=np.float32)
+        emb = np.array(self._emb, dtype=np.float32) if len(self._ids) else np.zeros((0, new.shape[1]), np.float32)
+        extra = []
+        for id_, doc, meta, vec in zip(ids, documents, metadatas, new):
+            i = self._pos.get(id_)
+            if i is None:
+                self._pos[id_] = len(self._ids) + len(extra)
+                extra.append((id_, doc, dict(meta or {}), vec))
+            else:
+                self._docs[i], self._metas[i] = doc, dict(meta or {})
+                emb[i] = vec
+        if extra:
+            emb = np.vstack([emb, np.stack([e[3] for e in extra])])
+            for id_, doc, meta, _ in extra:
+                self._ids.append(id_); self._docs.append(doc); self._metas.append(meta)
+        self._emb = emb
+        self._columns.clear()
+
+    def delete(self, ids: List[str]) -> None:
+        drop = {self._pos[i] for i in ids if i in self._pos}
+        if not drop:
+            return
+        keep = [i for i in range(len(self._ids)) if i not in drop]
+        self._ids = [self._ids[i] for i in keep]
+        self._docs = [self._docs[i] for i in keep]
+        self._metas = [self._metas[i] for i in keep]
+        self._emb = np.array(self._emb[keep], dtype=np.float32)
+        self._pos = {id_: i for i, id_ in enumerate(self._ids)}
+        self._columns.clear()
+
+    def get(self, ids: List[str], include: List[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        idx = [self._pos[i] for i in ids if i in self._pos]
+        return self._pick(idx, include)
+
+    def query(self, query_embeddings, n_results: int = 10,
+              include: List[str] = ("documents", "metadatas", "distances"),
+              where: Optional[Dict] = None) -> Dict[str, Any]:
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        out: Dict[str, Any] = {"ids": []}
+        for k in include:
+            out[k] = []
+        if not len(self._ids):
+            for k in out:
+                out[k] = [[] for _ in range(len(q))]
+            return out
+        sims = q @ self._emb.T  # [n_queries, n_chunks]; vectors are L2-normalized
+        mask = self._mask(where)
+        if mask is not None:
+            sims[:, ~mask] = -np.inf
+        n_valid = int(mask.sum()) if mask is not None else sims.shape[1]
+        k = min(int(n_results), n_valid)
+        for row in sims:
+            if k <= 0:
+                top = np.zeros(0, dtype=np.int64)
+            else:
+                top = np.argpartition(-row, k - 1)[:k]
+                top = top[np.argsort(-row[top], kind="stable")]
+            picked = self._pick(top.tolist(), include)
+            for key, val in picked.items():
+                out[key].append(val)
+            if "distances" in include:
+                out["distances"].append((1.0 - row[top]).astype(float).tolist())  # cosine distance, as Chroma
+        return out
+
+    # -------- internals --------
+    def _pick(self, idx: List[int], include) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"ids": [self._ids[i] for i in idx]}
+        if "documents" in include:
+            out["documents"] = [self._docs[i] for i in idx]
+        if "metadatas" in include:
+            out["metadatas"] = [dict(self._metas[i]) for i in idx]
+        if "embeddings" in include:
+            out["embeddings"] = [self._emb[i].tolist() for i in idx]
+        return out
+
+    def _column(self, field: str) -> np.ndarray:
+        col = self._columns.get(field)
+        if col is None:
+            col = self._columns[field] = np.array([m.get(field) for m in self._metas], dtype=object)
+        return col
+
+    def _mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        terms = where["$and"] if "$and" in where else [where]
+        mask = np.ones(len(self._ids), dtype=bool)
+        for t in terms:
+            (field, cond), = t.items()
+            mask &= self._column(field) == cond["$eq"]
+        return mask
+
+
+class SharedExactCollection(SharedIndex):
+    """Process-wide ExactCollection handle (see SharedIndex)."""
+
+    fallback_file = EMB_FILE
+
+    def _open(self, reopening: bool):
+        return ExactCollection.load(self.persist_dir)
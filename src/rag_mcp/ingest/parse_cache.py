@@ -0,0 +1,78 @@
+# src/rag_mcp/ingest/parse_cache.py
+"""
+Content-addressed cache of extract_sections() results.
+
+An entry is keyed by the sha256 of the page HTML and the tree builder, and
+lives under a directory named after PARSER_VERSION, a hash of
+parse_sunway.py and the BeautifulSoup version. Editing the parser therefore
+moves every lookup to a fresh, empty directory; prune() deletes the old ones.
+One small JSON file per entry keeps concurrent sync_batch workers from
+contending for a shared index.
+"""
+import hashlib, json, os, shutil
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import bs4
+
+from . import parse_sunway
+from .parse_sunway import extract_sections
+
+
+def _parser_version() -> str:
+    h = hashlib.sha256(Path(parse_sunway.__file__).read_bytes())
+    h.update(bs4.__version__.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+PARSER_VERSION = _parser_version()
+
+
+class ParseCache:
+    def __init__(self, cache_dir: str):
+        self.root = cache_dir
+        self.dir = os.path.join(cache_dir, PARSER_VERSION)
+        self.hits = self.misses = 0
+
+    def _path(self, html: str, parser: str) -> str:
+        key = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        return os.path.join(self.dir, f"{key}.{parser}.json")
+
+    def get(self, html: str, parser: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(html, parser), encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def put(self, html: str, parser: str, sections: Dict[str, Any]) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        path = self._path(html, parser)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sections, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def extract(self, html: str, parser: str = "html.parser") -> Tuple[Dict[str, Any], bool]:
+        """(extract_sections(html, parser), served_from_cache)."""
+        cached = self.get(html, parser)
+        if cached is not None:
+            self.hits += 1
+            return cached, True
+        self.misses += 1
+        sections = extract_sections(html, parser=parser)
+        self.put(html, parser, sections)
+        return sections, False
+
+    def prune(self) -> int:
+        """Delete entries written by other parser versions; returns the directories removed."""
+        removed = 0
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name != PARSER_VERSION and os.path.isdir(os.path.join(self.root, name)):
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                    removed += 1
+        return removed
+
+    def entries(self) -> int:
+        return len([n for n in os.listdir(self.dir) if n.endswith(".json")]) if os.path.isdir(self.dir) else 0
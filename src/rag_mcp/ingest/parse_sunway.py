@@ -78,34 +78,44 @@ def _collect_until_next_section(start: Tag, max_chars: int = 4000) -> str:
         text = " ".join(parts).strip()
     return text
 
+def _overview_from_node(node: Tag) -> Optional[str]:
+    """
+    Overview text anchored at an #overview / [id*=overview] / a[name=overview]
+    node; None means "nothing here, try the next pattern".
+    """
+    # If this is a section/div with content, pull paragraphs inside
+    if isinstance(node, Tag) and node.name not in ("a",):
+        txt = _clean_text(node.get_text(" "))
+        if txt:
+            return txt[:4000]
+    # If it's an anchor <a name="overview">, collect after the nearest heading
+    if node.name == "a":
+        h = node.find_next(["h2","h3","p"])
+        if h and h.name in ("h2","h3"):
+            return _collect_until_next_section(h)
+        elif h and h.name == "p":
+            # gather a few paragraphs
+            txts = []
+            cur = h
+            total = 0
+            while cur and total < 4000 and cur.name == "p":
+                t = _clean_text(cur.get_text(" "))
+                if t:
+                    txts.append(t); total += len(t)
+                cur = cur.find_next_sibling()
+            if txts:
+                return " ".join(txts)
+    return None
+
 def _find_overview(soup: BeautifulSoup) -> str:
     # 1) Direct anchor/id patterns
     #   <section id="overview"> ... </section>  OR  <div id="programme-overview"> ...</div>
     for sel in ['#overview', '[id*="overview" i]', 'a[name="overview" i]']:
         node = soup.select_one(sel)
         if node:
-            # If this is a section/div with content, pull paragraphs inside
-            if isinstance(node, Tag) and node.name not in ("a",):
-                txt = _clean_text(node.get_text(" "))
-                if txt:
-                    return txt[:4000]
-            # If it's an anchor <a name="overview">, collect after the nearest heading
-            if node.name == "a":
-                h = node.find_next(["h2","h3","p"])
-                if h and h.name in ("h2","h3"):
-                    return _collect_until_next_section(h)
-                elif h and h.name == "p":
-                    # gather a few paragraphs
-                    txts = []
-                    cur = h
-                    total = 0
-                    while cur and total < 4000 and cur.name == "p":
-                        t = _clean_text(cur.get_text(" "))
-                        if t:
-                            txts.append(t); total += len(t)
-                        cur = cur.find_next_sibling()
-                    if txts:
-                        return " ".join(txts)
+            txt = _overview_from_node(node)
+            if txt is not None:
+                return txt
 
     # 2) Heading text variants: find <h2>/<h3> whose text matches any OVERVIEW_TITLES
     for h in soup.find_all(["h2","h3"]):
@@ -138,8 +148,170 @@ def _find_overview(soup: BeautifulSoup) -> str:
 
     return ""  # give up
 
-def extract_sections(html: str) -> Dict:
+def _modules_after(heading: Tag) -> List[str]:
+    """Module names in the first <ul> after a "Year N" heading."""
+    ul = heading.find_next("ul")
+    modules = []
+    if ul:
+        for li in ul.find_all("li", recursive=False):
+            t = _clean_text(li.get_text(" "))
+            if t:
+                modules.append(t)
+    return modules
+
+def _fees_texts(container: Optional[Tag]):
+    """(fees_text, fees_note) from the Malaysian student fees field."""
+    fees_text, fees_note = "", ""
+    if container:
+        fees_text = _clean_text(container.get_text(" "))
+        m = re.search(r"([^.]*?(?:indicative|exchange rate)[^.]*\.)", fees_text, re.I)
+        if m:
+            fees_note = _clean_text(m.group(1))
+    return fees_text, fees_note
+
+def _has_class(tag: Tag, cls: str) -> bool:
+    return cls in (tag.get("class") or ())
+
+def _first(found: Dict[str, Tag], key: str, tag: Tag) -> None:
+    if key not in found:
+        found[key] = tag
+
+def extract_sections(html: str, parser: str = "html.parser") -> Dict:
+    """
+    Single-pass extractor: one walk over the tree records every node the
+    fields come from (headings, the overview anchors, duration / intakes /
+    fees / career fields, body fallbacks); each field is then read from
+    those nodes. Same output as extract_sections_multipass().
+
+    `parser` is the BeautifulSoup tree builder ("html.parser", or "lxml" when
+    installed); sync_batch.py --check-parity verifies a faster builder
+    produces the same output.
+
+    Returns:
+      {
+        overview_text: str,
+        structure: [{year:int, modules:[str,..]}, ...],
+        fees_text: str,            # raw (kept for debugging)
+        fees_note: str,            # extra USD note when present
+        duration: str,
+        intakes: str,              # comma-separated (raw)
+        career_prospects: [str,..] # optional
+      }
+    """
+    soup = BeautifulSoup(html, parser)
+
+    headings: List[Tag] = []   # h2/h3/h4 in document order
+    found: Dict[str, Tag] = {}  # first node matching each pattern
+    careers: List[Tag] = []
+    career_boxes = 0
+    for tag in soup.find_all(True):
+        name = tag.name
+        if name in ("h2", "h3", "h4"):
+            headings.append(tag)
+        elif name in ("article", "main"):
+            _first(found, name, tag)
+        id_ = tag.get("id")
+        if isinstance(id_, str):
+            if id_ == "overview":
+                _first(found, "#overview", tag)
+            if "overview" in id_.lower():
+                _first(found, "[id*=overview]", tag)
+        if name == "a" and str(tag.get("name", "")).lower() == "overview":
+            _first(found, "a[name=overview]", tag)
+        classes = tag.get("class")
+        if classes:
+            if "coursedurationfield" in classes and tag.find_parent(class_="coursedurationbox"):
+                _first(found, "duration", tag)
+            if "field-content" in classes and tag.find_parent(class_="views-field-field-intakes"):
+                _first(found, "intakes", tag)
+            if "views-field-field-malaysian-student-fees" in classes:
+                _first(found, "fees", tag)
+            if "views-field-field-career-prospects" in classes:
+                career_boxes += 1
+            if "region-content" in classes:
+                _first(found, ".region-content", tag)
+            if "field--name-body" in classes:
+                if name == "div":
+                    _first(found, "div.field--name-body", tag)
+                if tag.find_parent("article"):
+                    _first(found, "article .field--name-body", tag)
+                if tag.find_parent(class_="node__content"):
+                    _first(found, ".node__content .field--name-body", tag)
+            if "node__content" in classes and tag.find_parent(class_="region-content"):
+                _first(found, ".region-content .node__content", tag)
+        # .views-field-field-career-prospects ul li: an li under a ul under the field
+        if name == "li" and career_boxes:
+            in_ul = False
+            for parent in tag.parents:
+                if parent.name == "ul":
+                    in_ul = True
+                elif in_ul and _has_class(parent, "views-field-field-career-prospects"):
+                    careers.append(tag)
+                    break
+
+    # -------- Overview (same precedence as _find_overview)
+    overview_text = None
+    for key in ("#overview", "[id*=overview]", "a[name=overview]"):
+        if key in found:
+            overview_text = _overview_from_node(found[key])
+            if overview_text is not None:
+                break
+    if overview_text is None:
+        for h in headings:
+            if h.name == "h4":
+                continue
+            title = _clean_text(h.get_text(" ")).lower()
+            if any(title == t.lower() for t in OVERVIEW_TITLES):
+                txt = _collect_until_next_section(h)
+                if txt:
+                    overview_text = txt
+                    break
+    if overview_text is None:
+        for key in ("div.field--name-body", "article .field--name-body",
+                    ".node__content .field--name-body", ".region-content .node__content"):
+            if key in found:
+                txt = _clean_text(found[key].get_text(" "))
+                if txt:
+                    overview_text = txt[:4000]
+                    break
+    if overview_text is None:
+        art = found.get("article") or found.get("main") or found.get(".region-content")
+        if art:
+            ps = art.find_all("p", limit=4)
+            txts = [_clean_text(p.get_text(" ")) for p in ps if _clean_text(p.get_text(" "))]
+            if txts:
+                overview_text = " ".join(txts)[:4000]
+
+    # -------- Programme Structure: first heading mentioning "Year N", then its <ul>
+    heading_texts = [h.get_text() for h in headings]
+    structure = []
+    for year in range(1, 7):
+        label = f"Year {year}"
+        hx = next((h for h, t in zip(headings, heading_texts) if label in t), None)
+        if not hx:
+            continue
+        modules = _modules_after(hx)
+        if modules:
+            structure.append({"year": year, "modules": modules})
+
+    duration_node, intakes_node = found.get("duration"), found.get("intakes")
+    fees_text, fees_note = _fees_texts(found.get("fees"))
+    return {
+        "overview_text": overview_text or "",
+        "structure": structure,
+        "fees_text": fees_text,
+        "fees_note": fees_note,
+        "duration": _clean_text(duration_node.get_text(" ")) if duration_node else "",
+        "intakes": _clean_text(intakes_node.get_text(" ")) if intakes_node else "",
+        "career_prospects": [t for t in (_clean_text(li.get_text(" ")) for li in careers) if t],
+    }
+
+def extract_sections_multipass(html: str, parser: str = "html.parser") -> Dict:
     """
+    Original extractor: one soup sweep per field (six for the year headings
+    alone). Kept as the reference extract_sections() is checked and
+    benchmarked against (tests/test_parse.py, scripts/bench_parse.py).
+
     Returns:
       {
         overview_text: str,
@@ -151,7 +323,7 @@ def extract_sections(html: str) -> Dict:
         career_prospects: [str,..] # optional
       }
     """
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, parser)
 
     # -------- Overview (robust)
     overview_text = _find_overview(soup)
@@ -162,13 +334,7 @@ def extract_sections(html: str) -> Dict:
         hx = soup.find(lambda tag: tag.name in ["h2","h3","h4"] and f"Year {year}" in tag.get_text())
         if not hx:
             continue
-        ul = hx.find_next("ul")
-        modules = []
-        if ul:
-            for li in ul.find_all("li", recursive=False):
-                t = _clean_text(li.get_text(" "))
-                if t:
-                    modules.append(t)
+        modules = _modules_after(hx)
         if modules:
             structure.append({"year": year, "modules": modules})
 
@@ -184,12 +350,7 @@ def extract_sections(html: str) -> Dict:
 
     # -------- Fees block (label is often 'Estimated Annual Course Fee')
     fees_container = soup.select_one(".views-field-field-malaysian-student-fees")
-    fees_text, fees_note = "", ""
-    if fees_container:
-        fees_text = _clean_text(fees_container.get_text(" "))
-        m = re.search(r"([^.]*?(?:indicative|exchange rate)[^.]*\.)", fees_text, re.I)
-        if m:
-            fees_note = _clean_text(m.group(1))
+    fees_text, fees_note = _fees_texts(fees_container)
 
     return {
         "overview_text": overview_text,
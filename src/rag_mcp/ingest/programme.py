@@ -0,0 +1,84 @@
+# src/rag_mcp/ingest/programme.py
+"""
+Programme JSON records from extracted page sections (shared by
+scripts/sync_batch.py and the in-process pipeline in rag_mcp/pipeline.py).
+"""
+import hashlib, json, re
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+from ..config import BASE_DIR
+from .normalize import parse_fees  # reuse common logic
+
+SCHEMA_PATH = Path(BASE_DIR) / "src/rag_mcp/schemas/programme.schema.json"
+
+# sync_batch.py's CLI defaults, for callers without an argparse namespace
+DEFAULTS = SimpleNamespace(url="", programme_name="", school="", level="Undergraduate", duration="", intakes="")
+
+def slugify(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", s.lower()).strip("-")
+
+def compute_content_hash(obj) -> str:
+    data = json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def programme_from_sections(html_path: Path, mini: dict, defaults=DEFAULTS) -> dict:
+    """
+    Programme record for one page. `mini` is extract_sections() output:
+    overview_text, structure[], fees_text, fees_note, duration, intakes, career_prospects.
+    """
+    # infer a temp programme_name from filename if not provided
+    programme_name = defaults.programme_name or html_path.stem.replace("_", " ").replace("-", " ").title()
+    pid = f"sunway:{slugify(defaults.school or 'sc')}:{slugify(programme_name)}"
+
+    fees = parse_fees(mini.get("fees_text",""), mini.get("fees_note",""))
+    duration = mini.get("duration") or (defaults.duration or "")
+    intakes  = mini.get("intakes") or (defaults.intakes or "")
+    intakes_list = [s.strip() for s in intakes.split(",") if s.strip()] if isinstance(intakes, str) else intakes
+
+    payload = {
+        "id": pid,
+        "programme_name": programme_name,
+        "school": defaults.school or "",
+        "level": defaults.level or "Undergraduate",
+        "duration": duration,
+        "intakes": intakes_list,
+        "url": defaults.url or "https://sunwayuniversity.edu.my",
+        "overview_text": mini.get("overview_text","").strip(),
+        "structure": mini.get("structure",[]),
+        "fees": fees,
+        "career_prospects": mini.get("career_prospects", []),
+        "last_fetched": date.today().isoformat(),
+    }
+
+    payload["source_hash"] = compute_content_hash({
+        "overview_text": payload["overview_text"],
+        "structure": payload["structure"],
+        "fees": payload["fees"],
+        "duration": payload["duration"],
+        "intakes": payload["intakes"],
+        "career_prospects": payload["career_prospects"]
+    })
+    return payload
+
+def render(payload: dict) -> str:
+    """Exact JSON text written for a programme."""
+    return json.dumps(payload, ensure_ascii=False, indent=2)
+
+def json_path_for(json_dir: str, payload: dict) -> Path:
+    return Path(json_dir) / f"{slugify(payload['programme_name'])}.json"
+
+def write_if_changed(json_dir: str, payload: dict, force: bool = False) -> bool:
+    """Write the record unless the file on disk has the same source_hash; True if written."""
+    json_path = json_path_for(json_dir, payload)
+    previous = None
+    if json_path.exists():
+        try:
+            previous = json.loads(json_path.read_text(encoding="utf-8"))
+        except Exception:
+            previous = None
+    if previous and (previous.get("source_hash") == payload["source_hash"]) and not force:
+        return False
+    json_path.write_text(render(payload), encoding="utf-8")
+    return True
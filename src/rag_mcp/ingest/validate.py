@@ -1,6 +1,20 @@
 import json, jsonschema
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
-def validate_programme(obj: dict, schema_path: str):
-    schema = json.loads(Path(schema_path).read_text(encoding="utf-8"))
-    jsonschema.validate(instance=obj, schema=schema)
+from ..schema_registry import SCHEMA_DIR, validate as validate_schema
+
+def validate_programme(obj: dict, schema_path: Optional[str] = None):
+    # compiled once per process; schema_path only matters when it points outside schemas/
+    path = Path(schema_path).resolve() if schema_path else SCHEMA_DIR / "programme.schema.json"
+    if path.parent == SCHEMA_DIR:
+        validate_schema(path.name, obj)
+    else:
+        _validator_for_path(str(path)).validate(obj)
+
+@lru_cache(maxsize=None)
+def _validator_for_path(path: str):
+    schema = json.loads(Path(path).read_text(encoding="utf-8"))
+    cls = jsonschema.validators.validator_for(schema)
+    return cls(schema, format_checker=cls.FORMAT_CHECKER)
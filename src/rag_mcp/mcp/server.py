@@ -1,7 +1,10 @@
 # src/rag_mcp/mcp/server.py
-import sys, json, argparse, logging, time, traceback, os
-from typing import Any, Dict, Optional
-from ..mcp.tools import search as rag_search, get as rag_get
+import sys, json, argparse, logging, time, traceback, os, random, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from ..config import MAX_INFLIGHT, SCHEMA_VALIDATION, SCHEMA_SAMPLE_RATE, WARMUP
+# Keep this import list light: tools.py (chromadb, sentence_transformers, torch) and
+# jsonschema are imported on first use, so initialize / tools/list answer in milliseconds.
 
 # ---------- JSON logging ----------
 class JsonFormatter(logging.Formatter):
@@ -33,9 +36,14 @@ def configure_logging(log_json: bool, level: str) -> None:
 log = logging.getLogger("rag_mcp.server")
 
 # ---------- JSON-RPC helpers ----------
+# Responses may be produced by worker threads; one line must never interleave with another.
+_WRITE_LOCK = threading.Lock()
+
 def _write(obj: Dict[str, Any]) -> None:
-    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    sys.stdout.flush()
+    line = json.dumps(obj, ensure_ascii=False) + "\n"
+    with _WRITE_LOCK:
+        sys.stdout.write(line)
+        sys.stdout.flush()
 
 def _error(id_: Optional[Any], code: int, message: str, data: Optional[Dict[str, Any]] = None) -> None:
     resp = {"jsonrpc": "2.0", "id": id_, "error": {"code": code, "message": message}}
@@ -46,7 +54,65 @@ def _error(id_: Optional[Any], code: int, message: str, data: Optional[Dict[str,
 def _result(id_: Any, result: Any) -> None:
     _write({"jsonrpc": "2.0", "id": id_, "result": result})
 
+# ---------- deferred tool backend ----------
+_tools_mod = None
+_tools_lock = threading.Lock()
+
+def _tools():
+    """Import mcp/tools.py on the first tools/call (seconds: torch, chromadb), not at startup."""
+    global _tools_mod
+    if _tools_mod is None:
+        with _tools_lock:
+            if _tools_mod is None:
+                t0 = time.perf_counter()
+                from . import tools
+                log.info("tool backend imported", extra={"import_ms": round((time.perf_counter() - t0) * 1000.0, 1)})
+                _tools_mod = tools
+    return _tools_mod
+
+def rag_search(query: str, top_k: int = 5) -> Dict[str, Any]:
+    return _tools().search(query, top_k=top_k)
+
+def rag_search_batch(queries: List[str], top_k: int = 5) -> Dict[str, Any]:
+    return _tools().search_batch(queries, top_k=top_k)
+
+def rag_get(doc_id: str) -> Dict[str, Any]:
+    return _tools().get(doc_id)
+
+# ---------- background warm-up ----------
+# state: "off" (not started), "running", "ready", "degraded" (some steps failed), "failed"
+_warmup: Dict[str, Any] = {"state": "off", "ms": None, "steps": {}, "error": None}
+_warmup_done = threading.Event()
+_warmup_done.set()  # nothing to wait for until a warm-up starts
+_warmup_lock = threading.Lock()
+
+def start_warmup() -> bool:
+    """Warm the tool backend in a daemon thread (once per process); False if already started."""
+    with _warmup_lock:
+        if _warmup["state"] != "off":
+            return False
+        _warmup["state"] = "running"
+        _warmup_done.clear()
+    threading.Thread(target=_run_warmup, name="rag-warmup", daemon=True).start()
+    return True
+
+def _run_warmup() -> None:
+    t0 = time.perf_counter()
+    try:
+        steps = _tools().warmup()
+        _warmup["steps"] = steps
+        _warmup["state"] = "degraded" if any("error" in s for s in steps.values()) else "ready"
+    except Exception as e:
+        _warmup["state"], _warmup["error"] = "failed", str(e)
+    finally:
+        _warmup["ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+        _warmup_done.set()
+        log.info("warm-up finished", extra={"state": _warmup["state"], "warmup_ms": _warmup["ms"],
+                                             "steps": _warmup["steps"], "error": _warmup["error"]})
+
 # ---------- MCP tool definitions ----------
+MAX_BATCH_QUERIES = 64  # rag.search_batch maxItems (also in schemas/rag_search_batch_request)
+
 def _list_tools_obj() -> Dict[str, Any]:
     return {
         "tools": [
@@ -62,6 +128,19 @@ def _list_tools_obj() -> Dict[str, Any]:
                     "required": ["query"]
                 }
             },
+            {
+                "name": "rag.search_batch",
+                "description": "rag.search for many queries in one call (one batched model pass); results in input order.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "queries": {"type": "array", "items": {"type": "string"}, "minItems": 1,
+                                    "maxItems": MAX_BATCH_QUERIES},
+                        "top_k": {"type": "integer", "minimum": 1, "maximum": 50}
+                    },
+                    "required": ["queries"]
+                }
+            },
             {
                 "name": "rag.get",
                 "description": "Fetch a stored chunk by id (text + metadata).",
@@ -86,6 +165,20 @@ def _call_tool(name: str, params: Dict[str, Any]) -> Any:
                    for r in out.get("results", [])[:5]]
         log.info("rag.search: response", extra={"query": q, "top_k": k, "preview": preview})
         return out
+    if name == "rag.search_batch":
+        qs = params.get("queries") or []
+        if not isinstance(qs, list) or not all(isinstance(q, str) for q in qs):
+            raise InvalidParams("rag.search_batch: 'queries' must be a list of strings",
+                                ["queries: must be a list of strings"])
+        # enforced even with schema checks off: one call must not hold a worker and the models indefinitely
+        if not 1 <= len(qs) <= MAX_BATCH_QUERIES:
+            raise InvalidParams(f"rag.search_batch: 'queries' must hold 1 to {MAX_BATCH_QUERIES} queries",
+                                [f"queries: {len(qs)} items (allowed 1..{MAX_BATCH_QUERIES})"])
+        k = int(params.get("top_k", 5))
+        log.debug("rag.search_batch: request", extra={"queries": qs, "top_k": k})
+        out = rag_search_batch(qs, top_k=k)
+        log.info("rag.search_batch: response", extra={"n_queries": len(qs), "top_k": k})
+        return out
     if name == "rag.get":
         doc_id = params.get("id", "")
         log.debug("rag.get: request", extra={"id": doc_id})
@@ -94,6 +187,45 @@ def _call_tool(name: str, params: Dict[str, Any]) -> Any:
         return out
     raise ValueError(f"Unknown tool: {name}")
 
+# ---------- schema checks ----------
+# tool name -> schema prefix in src/rag_mcp/schemas/ (<prefix>_request / <prefix>_response)
+TOOL_SCHEMAS = {"rag.search": "rag_search", "rag.search_batch": "rag_search_batch", "rag.get": "rag_get"}
+VALIDATION_MODES = ("off", "sampled", "strict")
+_validation = {"mode": SCHEMA_VALIDATION, "rate": SCHEMA_SAMPLE_RATE}
+
+class InvalidParams(ValueError):
+    def __init__(self, message: str, errors: List[str]):
+        super().__init__(message)
+        self.errors = errors
+
+def set_validation(mode: str, rate: float = SCHEMA_SAMPLE_RATE) -> None:
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode '{mode}' (expected one of {', '.join(VALIDATION_MODES)})")
+    _validation["mode"], _validation["rate"] = mode, float(rate)
+
+def _validate_now() -> bool:
+    mode = _validation["mode"]
+    return mode == "strict" or (mode == "sampled" and random.random() < _validation["rate"])
+
+def _check(tool: str, kind: str, obj: Any) -> None:
+    """
+    Validate tool arguments (kind="request") or results (kind="response").
+    strict: raise (InvalidParams for arguments); sampled: log and carry on.
+    """
+    prefix = TOOL_SCHEMAS.get(tool)
+    if prefix is None:
+        return
+    from .. import schema_registry  # jsonschema: only once a call is actually checked
+    errs = schema_registry.errors(f"{prefix}_{kind}", obj)
+    if not errs:
+        return
+    if _validation["mode"] != "strict":
+        log.warning("schema violation", extra={"tool": tool, "kind": kind, "errors": errs})
+    elif kind == "request":
+        raise InvalidParams(f"{tool}: arguments do not match {prefix}_request", errs)
+    else:
+        raise RuntimeError(f"{tool}: response does not match {prefix}_response: {'; '.join(errs)}")
+
 # ---------- MCP protocol: minimal handlers ----------
 PROTOCOL_VERSION = "2024-11-05"  # acceptable recent MCP protocol tag
 SERVER_NAME = "sunway-rag"
@@ -120,7 +252,13 @@ def _handle_tools_list() -> Dict[str, Any]:
 def _handle_tools_call(params: Dict[str, Any]) -> Dict[str, Any]:
     name = params.get("name")
     arguments = params.get("arguments") or {}
+    _warmup_done.wait()  # share the warm-up's initialization instead of racing it
+    check = _validate_now()  # one decision per call, so sampled calls check both sides
+    if check:
+        _check(name, "request", arguments)
     res = _call_tool(name, arguments)
+    if check:
+        _check(name, "response", res)
 
     # MCP CallToolResult JSON shape:
     # - content: list[ContentBlock]
@@ -137,43 +275,97 @@ def _handle_tools_call(params: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 def _handle_ping(_params: Dict[str, Any]) -> Dict[str, Any]:
-    return {"ok": True, "ts": time.time()}
+    # ready: a tools/call would not wait for imports or warm-up
+    ready = _tools_mod is not None and _warmup_done.is_set()
+    out = {"ok": True, "ts": time.time(), "ready": ready, "warmup": dict(_warmup)}
+    if _tools_mod is not None:
+        out["models"] = _tools_mod.model_stats()  # per-model memory, process RSS, torch threads
+        out["batching"] = _tools_mod.batching_stats()
+        out["caches"] = _tools_mod.cache_stats()  # result / semantic / rerank-score hits, misses, evictions
+        out["retrieval"] = _tools_mod.retrieval_stats()  # filter tiers, programme routing, fast path, rerank skips
+    return out
 
 # ---------- main stdio loop ----------
-def serve_stdio() -> None:
-    log.info("MCP stdio server started", extra={"transport":"stdio","tools":["rag.search","rag.get"]})
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            req = json.loads(line)
-        except Exception:
-            _error(None, -32700, "Parse error")
-            continue
+def _dispatch(id_: Any, method: Optional[str], params: Dict[str, Any]) -> None:
+    try:
+        if method == "initialize":
+            _result(id_, _handle_initialize(params))
+        elif method in ("tools/list", "tools.list"):
+            _result(id_, _handle_tools_list())
+        elif method in ("tools/call", "tools.call"):
+            _result(id_, _handle_tools_call(params))
+        elif method == "ping":
+            _result(id_, _handle_ping(params))
+        else:
+            _error(id_, -32601, f"Method not found: {method}")
+    except InvalidParams as e:
+        _error(id_, -32602, "Invalid params", {"detail": str(e), "errors": e.errors})
+    except Exception as e:
+        log.error("Unhandled server error", extra={"exc": traceback.format_exc()})
+        _error(id_, -32603, "Internal error", {"detail": str(e)})
 
-        if not isinstance(req, dict) or req.get("jsonrpc") != "2.0":
-            _error(req.get("id") if isinstance(req, dict) else None, -32600, "Invalid Request")
-            continue
+def serve_stdio(max_inflight: int = MAX_INFLIGHT, warmup: bool = WARMUP) -> None:
+    """
+    Read JSON-RPC requests line by line from stdin and answer on stdout.
 
-        id_ = req.get("id")
-        method = req.get("method")
-        params = req.get("params") or {}
+    With max_inflight > 1, tools/call requests run on a bounded worker pool
+    and their responses are written as soon as they finish (clients match
+    them by id). initialize, tools/list and ping are always answered inline,
+    so they never queue behind a slow search. When max_inflight calls are
+    already running, reading pauses until one completes.
 
+    With warmup, the tool backend is loaded in the background as soon as
+    initialize has been answered (see start_warmup()).
+    """
+    max_inflight = max(1, int(max_inflight))
+    log.info("MCP stdio server started", extra={"transport":"stdio","tools":["rag.search","rag.search_batch","rag.get"],
+                                                "max_inflight": max_inflight, "warmup": warmup})
+    pool: Optional[ThreadPoolExecutor] = None
+    slots = threading.BoundedSemaphore(max_inflight)
+    if max_inflight > 1:
+        pool = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="rag-mcp")
+
+    def _run_and_release(id_: Any, method: Optional[str], params: Dict[str, Any]) -> None:
         try:
-            if method == "initialize":
-                _result(id_, _handle_initialize(params))
-            elif method in ("tools/list", "tools.list"):
-                _result(id_, _handle_tools_list())
-            elif method in ("tools/call", "tools.call"):
-                _result(id_, _handle_tools_call(params))
-            elif method == "ping":
-                _result(id_, _handle_ping(params))
-            else:
-                _error(id_, -32601, f"Method not found: {method}")
-        except Exception as e:
-            log.error("Unhandled server error", extra={"exc": traceback.format_exc()})
-            _error(id_, -32603, "Internal error", {"detail": str(e)})
+            _dispatch(id_, method, params)
+        finally:
+            slots.release()
+
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                req = json.loads(line)
+            except Exception:
+                _error(None, -32700, "Parse error")
+                continue
+
+            if not isinstance(req, dict) or req.get("jsonrpc") != "2.0":
+                _error(req.get("id") if isinstance(req, dict) else None, -32600, "Invalid Request")
+                continue
+
+            id_ = req.get("id")
+            method = req.get("method")
+            params = req.get("params") or {}
+
+            if pool is None or method not in ("tools/call", "tools.call"):
+                _dispatch(id_, method, params)
+                if warmup and method == "initialize":
+                    start_warmup()
+                continue
+
+            slots.acquire()
+            try:
+                pool.submit(_run_and_release, id_, method, params)
+            except Exception:
+                slots.release()
+                raise
+    finally:
+        if pool is not None:
+            # drain in-flight calls so every request read gets its response
+            pool.shutdown(wait=True)
 
 # ---------- CLI ----------
 def main() -> None:
@@ -182,9 +374,19 @@ def main() -> None:
     p.add_argument("--no-stdio", dest="stdio", action="store_false", help="Disable stdio")
     p.add_argument("--log-json", action="store_true", help="Emit JSON logs to stderr")
     p.add_argument("--log-level", default="INFO", choices=["DEBUG","INFO","WARNING","ERROR"], help="Logging level")
+    p.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT,
+                   help="Max tools/call requests run concurrently (1 = serial, in order)")
+    p.add_argument("--validate", default=SCHEMA_VALIDATION, choices=VALIDATION_MODES,
+                   help="Check tool arguments/responses against src/rag_mcp/schemas (sampled: log only)")
+    p.add_argument("--validate-rate", type=float, default=SCHEMA_SAMPLE_RATE,
+                   help="Fraction of calls checked in sampled mode")
+    p.add_argument("--warmup", dest="warmup", action="store_true", default=WARMUP,
+                   help="Load models/collection in the background after initialize (default: WARMUP)")
+    p.add_argument("--no-warmup", dest="warmup", action="store_false", help="Load everything on the first tools/call")
     args = p.parse_args()
 
     configure_logging(args.log_json, args.log_level)
+    set_validation(args.validate, args.validate_rate)
 
     if sys.platform.startswith("win"):
     # Python 3.7+ only
@@ -195,7 +397,7 @@ def main() -> None:
     os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
 
     if args.stdio:
-        serve_stdio()
+        serve_stdio(max_inflight=args.max_inflight, warmup=args.warmup)
     else:
         log.error("Only stdio is implemented. Use --stdio.")
         sys.exit(2)
@@ -1,20 +1,33 @@
 # src/rag_mcp/mcp/tools.py
 from typing import Dict, List, Optional, Tuple
-import re, json, math
+import re, json, math, threading, time
+from collections import Counter
 from pathlib import Path
 
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
+from sentence_transformers import util
 
-from ..config import CHROMA_DIR, COLLECTION, TOP_K, JSON_DIR, EMBED_MODEL
-from ..index.reranker import rerank as maybe_rerank
+from ..config import (COLLECTION, TOP_K, JSON_DIR,
+                      RETRIEVAL_MODE, RETRIEVAL_OVERFETCH,
+                      RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL,
+                      SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, FACT_FAST_PATH,
+                      BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, BATCH_BUCKET_TOKENS)
+from ..cache import LRUCache, SemanticCache, normalize_query
+from ..index.batching import MicroBatcher
+from ..index.reranker import adaptive_rerank_batch, get_reranker, score_cache_stats, rerank_batching_stats
+from ..index.store import shared_index
+from ..index.embedder import embed_model_id, get_embedder
+from ..index.models import model_stats
+from ..index.aliases import ProgrammeMatcher, build_aliases, read_aliases
+from ..index.facts import load_fact_table
 
 # -------- intent routing --------
 FEE_WORDS = re.compile(r"\b(fee|fees|tuition|per\s*year|cost|price|annual)\b", re.I)
 STRUCTURE_WORDS = re.compile(r"\b(year\s*\d|structure|modules?|subjects?)\b", re.I)
 OVERVIEW_WORDS = re.compile(r"\b(overview|what\s+is|about|summary)\b", re.I)
 YEAR_CAPTURE = re.compile(r"year\s*(\d)", re.I)
+DURATION_WORDS = re.compile(r"\b(duration|how\s+long|how\s+many\s+years)\b", re.I)
+INTAKE_WORDS = re.compile(r"\b(intakes?|start\s+dates?|when\s+(?:can\s+i\s+|does\s+it\s+)?start|enrol(?:l)?(?:ment)?)\b", re.I)
 
 def _classify_section_year(q: str) -> Tuple[Optional[str], Optional[int]]:
     if FEE_WORDS.search(q): return ("fees", None)
@@ -24,6 +37,31 @@ def _classify_section_year(q: str) -> Tuple[Optional[str], Optional[int]]:
     if OVERVIEW_WORDS.search(q): return ("overview", None)
     return (None, None)
 
+def _classify_fact(q: str, section: Optional[str]) -> Optional[str]:
+    """Which fact-table field answers the query: "fees", "duration", "intakes" or None."""
+    if section == "fees": return "fees"
+    if section is not None: return None  # structure / overview need the chunks
+    if DURATION_WORDS.search(q): return "duration"
+    if INTAKE_WORDS.search(q): return "intakes"
+    return None
+
+# -------- counters (exposed via retrieval_stats) --------
+_COUNTS: Counter = Counter()
+_COUNTS_LOCK = threading.Lock()
+
+def _count(key: str, n: int = 1) -> None:
+    with _COUNTS_LOCK:
+        _COUNTS[key] += n
+
+def retrieval_stats() -> Dict[str, int]:
+    """
+    Counters since startup, e.g. tier.filtered / tier.programme / tier.unfiltered
+    (which filter tier served a search) and programme.lexical / programme.dense
+    (how the programme was resolved).
+    """
+    with _COUNTS_LOCK:
+        return dict(_COUNTS)
+
 # -------- load corpus programme names + embed once -------- changed into
 # -------- load corpus programme names (lazy) + embed once --------
 _JSON_DIR = Path(JSON_DIR)  # use absolute path from config
@@ -50,33 +88,105 @@ def _load_programme_names() -> List[str]:
     return out
 
 PROGRAMME_NAMES: Optional[List[str]] = None
-_MODEL: Optional[SentenceTransformer] = None
+_MATCHER: Optional[ProgrammeMatcher] = None
+_MODEL = None  # the registry's EMBED_MODEL instance (shared with index/embedder.py)
 _PROG_EMB = None  # type: ignore
+_INIT_LOCK = threading.Lock()  # concurrent tools/call must not load the model twice
 
 def _ensure_model_and_programmes() -> None:
     global PROGRAMME_NAMES, _MODEL, _PROG_EMB
-    if PROGRAMME_NAMES is None:
-        PROGRAMME_NAMES = _load_programme_names()
-    if _MODEL is None:
-        _MODEL = SentenceTransformer(EMBED_MODEL, local_files_only=True)
-    if PROGRAMME_NAMES and _PROG_EMB is None:
-        _PROG_EMB = _MODEL.encode(PROGRAMME_NAMES, normalize_embeddings=True)
-
-def _pick_programme_name(query: str) -> Optional[str]:
+    if _MODEL is not None and PROGRAMME_NAMES is not None and (_PROG_EMB is not None or not PROGRAMME_NAMES):
+        return
+    with _INIT_LOCK:
+        if PROGRAMME_NAMES is None:
+            PROGRAMME_NAMES = _load_programme_names()
+        if _MODEL is None:
+            _MODEL = get_embedder()
+        if PROGRAMME_NAMES and _PROG_EMB is None:
+            _PROG_EMB = _MODEL.encode(PROGRAMME_NAMES, normalize_embeddings=True)
+
+# concurrent searches share forward passes (see index/batching.py)
+_QUERY_BATCHER = MicroBatcher("embed", lambda texts: _MODEL.encode(texts, normalize_embeddings=True),
+                              max_batch=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+                              bucket_tokens=BATCH_BUCKET_TOKENS)
+
+def _embed_queries(queries: List[str]):
+    """Normalized EMBED_MODEL vectors, one encode batch for all queries; computed once per search and reused."""
+    _ensure_model_and_programmes()
+    return np.stack(_QUERY_BATCHER(queries))
+
+def _embed_query(query: str):
+    return _embed_queries([query])[0]
+
+def batching_stats() -> Dict[str, Dict]:
+    """Micro-batching per model: requests, forward passes, batch-size and queue-wait histograms."""
+    return {"embed": _QUERY_BATCHER.stats(), "rerank": rerank_batching_stats()}
+
+def _ensure_matcher() -> ProgrammeMatcher:
+    """Lexical matcher over the aliases build_index.py wrote (derived from JSON if missing)."""
+    global PROGRAMME_NAMES, _MATCHER
+    if _MATCHER is not None:
+        return _MATCHER
+    with _INIT_LOCK:
+        if PROGRAMME_NAMES is None:
+            PROGRAMME_NAMES = _load_programme_names()
+        if _MATCHER is None:
+            aliases = read_aliases(_COLLECTION.persist_dir)
+            if aliases is None:
+                aliases = build_aliases({"programme_name": n} for n in PROGRAMME_NAMES)
+            _MATCHER = ProgrammeMatcher(aliases)
+    return _MATCHER
+
+def _route_programme(query: str, q_emb=None, hits: Optional[List[str]] = None) -> Tuple[Optional[str], str]:
+    """
+    Programme the query is about, and how it was resolved:
+    "lexical" (unique alias hit), "dense_tiebreak", "dense" or "none".
+    `hits` can pass in an already computed _ensure_matcher().match(query).
+    """
+    # 1) lexical: names, subjects and acronyms ("BSc CS", "Business Mgmt") — no model needed
+    if hits is None:
+        hits = _ensure_matcher().match(query)
+    if len(hits) == 1:
+        _count("programme.lexical")
+        return hits[0], "lexical"
+
+    # 2) dense: break a lexical tie, or guess when no programme was named
     _ensure_model_and_programmes()
     if not PROGRAMME_NAMES or _PROG_EMB is None:
-        return None
+        return None, "none"
 
-    q_emb = _MODEL.encode([query], normalize_embeddings=True)  # type: ignore[arg-type]
+    if q_emb is None:
+        q_emb = _embed_query(query)
     sims = util.cos_sim(q_emb, _PROG_EMB)[0]  # shape: [N]
+    if hits:
+        _count("programme.dense_tiebreak")
+        idx = [i for i, n in enumerate(PROGRAMME_NAMES) if n in hits]
+        if idx:
+            return PROGRAMME_NAMES[max(idx, key=lambda i: float(sims[i]))], "dense_tiebreak"
     top_idx = int(sims.argmax().item())
     top_sim = float(sims[top_idx])
-    return PROGRAMME_NAMES[top_idx] if top_sim >= 0.35 else None  # conservative threshold
+    _count("programme.dense")
+    if top_sim >= 0.35:  # conservative threshold
+        return PROGRAMME_NAMES[top_idx], "dense"
+    return None, "none"
+
+def _pick_programme_name(query: str, q_emb=None) -> Optional[str]:
+    return _route_programme(query, q_emb)[0]
+
+# -------- vector store helpers --------
+_COLLECTION = shared_index()  # VECTOR_BACKEND; opened lazily, reopened on rebuild
 
-# -------- Chroma helpers --------
 def _get_col():
-    client = chromadb.PersistentClient(path=CHROMA_DIR, settings=Settings(allow_reset=False))
-    return client.get_or_create_collection(name=COLLECTION, metadata={"hnsw:space": "cosine"})
+    col = _COLLECTION.get()
+    built_with = _COLLECTION.info.get("embed_model")
+    # "<model>@<backend>": any backend of the same model gives comparable query vectors
+    if built_with and built_with.split("@")[0] != embed_model_id():
+        # query vectors from one model are meaningless against another model's index
+        raise RuntimeError(
+            f"[RAG] Index at '{_COLLECTION.persist_dir}' was built with embed model '{built_with}' "
+            f"but EMBED_MODEL is '{embed_model_id()}'. Rebuild it with scripts/build_index.py."
+        )
+    return col
 
 def _where(section: Optional[str], year: Optional[int], programme: Optional[str]) -> Optional[Dict]:
     terms=[]
@@ -86,32 +196,145 @@ def _where(section: Optional[str], year: Optional[int], programme: Optional[str]
     if not terms: return None
     return terms[0] if len(terms)==1 else {"$and": terms}
 
-def _query(col, query: str, n_pre: int, where: Optional[Dict]):
-    return col.query(query_texts=[query], n_results=n_pre,
+def _query(col, q_emb, n_pre: int, where: Optional[Dict]):
+    # pass our own vector: Chroma must not re-embed the text with its default model
+    return col.query(query_embeddings=[q_emb.tolist()], n_results=n_pre,
                      include=["documents","metadatas","distances"], where=where)
 
-def _query_with_backoff(col, query: str, n_pre: int,
+def _query_many(col, q_embs, n_pre: int) -> List[Dict]:
+    """One unfiltered Chroma call for many query vectors, split into per-query results."""
+    res = col.query(query_embeddings=[e.tolist() for e in q_embs], n_results=n_pre,
+                    include=["documents","metadatas","distances"])
+    return [{k: [res[k][j]] for k in ("ids", "documents", "metadatas", "distances")}
+            for j in range(len(q_embs))]
+
+def _tiers(section: Optional[str], year: Optional[int], programme: Optional[str]):
+    """
+    Filter tiers in preference order, exactly as the backoff cascade tries them:
+    A) programme + section/year, B) programme only, C) no filter.
+    Yields (tier_name, where) pairs.
+    """
+    where_a = _where(section, year, programme)
+    yield ("filtered" if where_a else "unfiltered", where_a)
+    if where_a is None:
+        return
+    if programme:
+        yield ("programme", _where(None, None, programme))
+    yield ("unfiltered", None)
+
+def _matches(meta: Optional[Dict], where: Optional[Dict]) -> bool:
+    """In-memory equivalent of the $eq / $and filters built by _where()."""
+    if where is None:
+        return True
+    terms = where["$and"] if "$and" in where else [where]
+    meta = meta or {}
+    for t in terms:
+        (key, cond), = t.items()
+        if meta.get(key) != cond["$eq"]:
+            return False
+    return True
+
+def _served(res: Dict, tier: str) -> Dict:
+    """Count which filter tier answered and tag the result with it."""
+    _count(f"tier.{tier}")
+    res["tier"] = tier
+    return res
+
+def _query_with_backoff(col, q_emb, n_pre: int,
                         section: Optional[str], year: Optional[int],
                         programme: Optional[str]):
     # A) programme + section/year
-    res = _query(col, query, n_pre, _where(section, year, programme))
-    if res.get("documents") and res["documents"][0]: return res
+    res = _query(col, q_emb, n_pre, _where(section, year, programme))
+    if res.get("documents") and res["documents"][0]:
+        return _served(res, "filtered" if _where(section, year, programme) else "unfiltered")
     # B) programme only (drop section/year first)
     if programme:
-        res = _query(col, query, n_pre, _where(None, None, programme))
-        if res.get("documents") and res["documents"][0]: return res
+        res = _query(col, q_emb, n_pre, _where(None, None, programme))
+        if res.get("documents") and res["documents"][0]:
+            return _served(res, "programme")
     # C) no filter
-    return _query(col, query, n_pre, None)
+    return _served(_query(col, q_emb, n_pre, None), "unfiltered")
 
-# -------- public tools --------
-def search(query: str, top_k: int = TOP_K) -> Dict:
-    col = _get_col()
-    section, year = _classify_section_year(query)
-    programme = _pick_programme_name(query)
+def _n_fetch(n_pre: int, total: int) -> int:
+    return min(total, max(n_pre, RETRIEVAL_OVERFETCH))
 
-    n_pre = max(top_k, 20)
-    res = _query_with_backoff(col, query, n_pre, section, year, programme)
+def _query_single_pass(col, q_emb, n_pre: int,
+                       section: Optional[str], year: Optional[int],
+                       programme: Optional[str], total: int, window: Optional[Dict] = None):
+    """
+    Same answer as _query_with_backoff from (usually) one ANN query.
 
+    Over-fetches the nearest RETRIEVAL_OVERFETCH chunks unfiltered, then
+    serves the first tier with hits. A tier is taken from the window when
+    the window holds the whole collection or at least n_pre of its members
+    (then they are its true top n_pre); otherwise that tier falls back to
+    its own filtered query, as the cascade would have run it.
+    A window already fetched by _query_many (with _n_fetch()) can be passed in.
+    """
+    n_fetch = _n_fetch(n_pre, total)
+    if window is None:
+        window = _query(col, q_emb, n_fetch, None)
+    exhaustive = n_fetch >= total
+    for tier, where in _tiers(section, year, programme):
+        idx = [i for i, m in enumerate(window["metadatas"][0]) if _matches(m, where)][:n_pre]
+        if exhaustive or len(idx) >= n_pre:
+            if not idx and where is not None:
+                continue
+            return _served({k: [[window[k][0][i] for i in idx]]
+                            for k in ("ids", "documents", "metadatas", "distances")}, tier)
+        res = _query(col, q_emb, n_pre, where)
+        if (res.get("documents") and res["documents"][0]) or where is None:
+            return _served(res, tier)
+    raise AssertionError("unreachable: the unfiltered tier always returns")
+
+# -------- result cache --------
+_RESULT_CACHE = LRUCache(RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL)
+_SEMANTIC_CACHE = SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD)
+
+def _served_from_cache(resp: Dict) -> Dict:
+    """
+    A cached response, stored without its per-request rerank info; this
+    request ran no rerank (fact fast-path answers never had one).
+    """
+    if "fast_path" in resp:
+        return resp
+    return dict(resp, rerank={"ran": False, "reason": "cache", "pairs": 0, "pairs_scored": 0})
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {"result": _RESULT_CACHE.stats(), "semantic": _SEMANTIC_CACHE.stats(),
+            "rerank": score_cache_stats()}
+
+# -------- fact table fast path --------
+_FACTS: Tuple[Optional[str], Dict[str, Dict]] = (None, {})
+_FACTS_LOCK = threading.Lock()
+
+def _fact_table() -> Dict[str, Dict]:
+    """Fact table from JSON_DIR, reloaded whenever the index version changes."""
+    global _FACTS
+    version = _COLLECTION.version
+    if _FACTS[0] == version and version is not None:
+        return _FACTS[1]
+    with _FACTS_LOCK:
+        if _FACTS[0] != version or version is None:
+            _FACTS = (version, load_fact_table(JSON_DIR))
+    return _FACTS[1]
+
+def _fact_answer(fact: str, programme: str) -> Optional[Dict]:
+    """rag.search response built from the fact table alone (no model inference)."""
+    row = _fact_table().get(programme)
+    if row is None:
+        return None
+    chunk = row["fees_chunk"]
+    meta = dict(chunk["metadata"])
+    meta["facts"] = {"fees": row["fees"], "duration": row["duration"], "intakes": row["intakes"]}
+    _count(f"fast_path.{fact}")
+    return {
+        "results": [{"id": chunk["id"], "text": chunk["text"], "score": 1.0, "metadata": meta}],
+        "fast_path": {"fact": fact, "programme": programme},
+    }
+
+# -------- search pipeline --------
+def _candidates(res: Dict, programme: Optional[str]) -> List[Dict]:
     cands: List[Dict] = []
     n = len(res["documents"][0]) if res.get("documents") else 0
     for i in range(n):
@@ -128,11 +351,139 @@ def search(query: str, top_k: int = TOP_K) -> Dict:
         for c in cands:
             if (c.get("metadata",{}) or {}).get("programme_name","").lower() == pl:
                 c["score"] += 0.05
+    return cands
+
+def _search_many(col, queries: List[str], top_k: int) -> List[Dict]:
+    """
+    Route, retrieve and rerank several queries together: one encode batch,
+    one multi-query Chroma call and one CrossEncoder predict batch in total.
+    Fact questions about a lexically named programme skip all of it.
+    """
+    outs: List[Optional[Dict]] = [None] * len(queries)
+    routed = []  # (i, section, year, lexical hits) for queries that need the models
+    for i, query in enumerate(queries):
+        section, year = _classify_section_year(query)
+        named = _ensure_matcher().match_all(query)
+        hits = ProgrammeMatcher.best(named)
+        fact = _classify_fact(query, section) if FACT_FAST_PATH else None
+        # fee/duration/intake question naming exactly one programme: answer from the table
+        # (not "CS vs Psychology fees": one programme's row would silently drop the other)
+        if fact and len(named) == 1:
+            _count("programme.lexical")
+            outs[i] = _fact_answer(fact, hits[0])
+        if outs[i] is None:
+            routed.append((i, section, year, hits))
+    if not routed:
+        return outs  # type: ignore[return-value]
+
+    # the only embedder forward pass for these searches
+    q_embs: List = [None] * len(queries)
+    for (i, _, _, _), emb in zip(routed, _embed_queries([queries[r[0]] for r in routed])):
+        q_embs[i] = emb
+
+    pending = []  # (i, section, year, programme, how, tag)
+    for i, section, year, hits in routed:
+        programme, how = _route_programme(queries[i], q_embs[i], hits=hits)
+        # near-duplicate of a recent query with the same routing: skip retrieval and rerank
+        tag = (section, year, programme, top_k, _COLLECTION.version)
+        hit = _SEMANTIC_CACHE.lookup(q_embs[i], tag)
+        if hit is not None:
+            outs[i] = _served_from_cache(hit)
+        else:
+            pending.append((i, section, year, programme, how, tag))
+    if not pending:
+        return outs  # type: ignore[return-value]
 
-    cands = maybe_rerank(query, cands)
-    return {"results": cands[:top_k]}
+    n_pre = max(top_k, 20)
+    total = _COLLECTION.count()
+    if RETRIEVAL_MODE == "cascade" or total == 0:
+        results = [_query_with_backoff(col, q_embs[i], n_pre, sec, yr, prog)
+                   for i, sec, yr, prog, _, _ in pending]
+    else:
+        windows = _query_many(col, [q_embs[p[0]] for p in pending], _n_fetch(n_pre, total))
+        results = [_query_single_pass(col, q_embs[i], n_pre, sec, yr, prog, total, window=w)
+                   for (i, sec, yr, prog, _, _), w in zip(pending, windows)]
+
+    requests = []
+    for (i, section, _, programme, how, _), res in zip(pending, results):
+        # intent and programme both pinned down and the filtered tier answered: dense order is trusted
+        confident = section is not None and how == "lexical" and res.get("tier") == "filtered"
+        requests.append((queries[i], _candidates(res, programme), top_k, confident))
+
+    for (i, _, _, _, _, tag), (cands, rerank_info) in zip(pending, adaptive_rerank_batch(requests)):
+        _count("rerank.ran" if rerank_info["ran"] else "rerank.skipped")
+        _count("rerank.pairs_scored", rerank_info["pairs_scored"])
+        _SEMANTIC_CACHE.put(q_embs[i], tag, {"results": cands[:top_k]})
+        outs[i] = {"results": cands[:top_k], "rerank": rerank_info}
+    return outs  # type: ignore[return-value]
+
+# -------- public tools --------
+def search(query: str, top_k: int = TOP_K) -> Dict:
+    return search_batch([query], top_k)["results"][0]["response"]
+
+def search_batch(queries: List[str], top_k: int = TOP_K) -> Dict:
+    """
+    rag.search for many queries in one call. Returns
+    {"results": [{"query": q, "response": <rag.search response>}, ...]} in input order.
+    """
+    col = _get_col()
+    outs: List[Optional[Dict]] = [None] * len(queries)
+    misses: Dict[Tuple, List[int]] = {}  # cache key -> positions (duplicates computed once)
+    for i, query in enumerate(queries):
+        # index version in the key: a rebuild makes every older entry unreachable;
+        # case kept, since "IT fees" and "it fees" can route to different programmes
+        key = (normalize_query(query, keep_case=True), top_k, _COLLECTION.version)
+        if key in misses:
+            misses[key].append(i)
+            continue
+        cached = _RESULT_CACHE.get(key)
+        if cached is None:
+            misses[key] = [i]
+        else:
+            outs[i] = _served_from_cache(cached)
+    if misses:
+        todo = list(misses.items())
+        for (key, idx), out in zip(todo, _search_many(col, [queries[idx[0]] for _, idx in todo], top_k)):
+            _RESULT_CACHE.put(key, {k: v for k, v in out.items() if k != "rerank"})
+            for i in idx:
+                outs[i] = out
+    return {"results": [{"query": q, "response": o} for q, o in zip(queries, outs)]}
 
 def get(doc_id: str) -> Dict:
     col = _get_col()
     out = col.get(ids=[doc_id], include=["documents","metadatas"])
     return {"id": out["ids"][0], "text": out["documents"][0], "metadata": out["metadatas"][0]}
+
+# -------- warm-up --------
+def warmup(query: str = "What are the fees for Computer Science?") -> Dict[str, Dict]:
+    """
+    Load what the first search would otherwise load inside the request: the
+    collection, the embedder plus programme-name embeddings, the alias
+    matcher, the fact table and the CrossEncoder, then push one dummy input
+    through each model and the vector store so lazy kernels and thread pools
+    are set up. Every step goes through the same locked initializers the
+    request path uses, so a search arriving meanwhile waits for (and reuses)
+    the same objects. Caches are left untouched.
+
+    Returns {step: {"ms": float}} with an "error" entry for steps that failed
+    (the remaining steps still run).
+    """
+    steps: Dict[str, Dict] = {}
+    q_emb: List = []
+
+    def step(name, fn):
+        t0 = time.perf_counter()
+        try:
+            fn()
+            steps[name] = {"ms": round((time.perf_counter() - t0) * 1000.0, 1)}
+        except Exception as e:
+            steps[name] = {"ms": round((time.perf_counter() - t0) * 1000.0, 1), "error": str(e)}
+
+    step("collection", lambda: _COLLECTION.count())
+    step("embedder", _ensure_model_and_programmes)
+    step("matcher", _ensure_matcher)
+    step("fact_table", _fact_table)
+    step("embed_query", lambda: q_emb.append(_embed_query(query)))
+    step("vector_query", lambda: _query(_get_col(), q_emb[0], 1, None))
+    step("reranker", lambda: get_reranker().predict([(query, query)]))
+    return steps
@@ -0,0 +1,230 @@
+# src/rag_mcp/pipeline.py
+"""
+In-process, streaming refresh: HTML pages -> programme records -> index.
+
+  load -> parse -> normalize -> validate -> chunk -> embed -> upsert
+
+Each stage is a generator running in its own thread, connected to the next
+by a bounded queue, so BeautifulSoup parsing of later pages overlaps with
+embedding of earlier ones (the transformer releases the GIL) and memory
+stays bounded. Only programmes whose source_hash / chunks changed since the
+last build reach the embed stage (see index/manifest.py); writing the
+programme JSON files is a side output of the validate stage.
+"""
+import glob, os, queue, threading, time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .config import (HTML_DIR, JSON_DIR, COLLECTION, VECTOR_BACKEND, EXACT_DTYPE, PARSE_CACHE_DIR,
+                     EMBED_BATCH_SIZE, UPSERT_BATCH_SIZE)
+from .ingest.fetch_html import load_html
+from .ingest.parse_cache import ParseCache
+from .ingest.parse_sunway import extract_sections
+from .ingest.programme import DEFAULTS, SCHEMA_PATH, programme_from_sections, write_if_changed
+from .ingest.validate import validate_programme
+from .index.aliases import build_aliases, read_aliases, write_aliases
+from .index.manifest import BuildPlanner, load_manifest, save_manifest
+from .index.store import index_dir, open_for_build, upsert_chunks, write_index_version
+
+_END = object()
+
+
+class Stage:
+    """
+    One pipeline stage: `fn` maps an iterator of inputs to an iterator of outputs.
+
+    busy_s excludes time spent waiting for input and blocked on a full
+    output queue, so items / busy_s is the stage's own throughput.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Iterator[Any]], Iterable[Any]]):
+        self.name = name
+        self.fn = fn
+        self.items_in = self.items_out = 0
+        self.wait_s = self.blocked_s = self.elapsed_s = 0.0
+        self.error: Optional[BaseException] = None
+        self._drained = False
+
+    @property
+    def busy_s(self) -> float:
+        return max(self.elapsed_s - self.wait_s - self.blocked_s, 0.0)
+
+    def _inputs(self, inq: "queue.Queue") -> Iterator[Any]:
+        while True:
+            t0 = time.perf_counter()
+            item = inq.get()
+            self.wait_s += time.perf_counter() - t0
+            if item is _END:
+                self._drained = True
+                return
+            self.items_in += 1
+            yield item
+
+    def run(self, inq: "queue.Queue", outq: "queue.Queue") -> None:
+        t_start = time.perf_counter()
+        try:
+            for out in self.fn(self._inputs(inq)):
+                t0 = time.perf_counter()
+                outq.put(out)
+                self.blocked_s += time.perf_counter() - t0
+                self.items_out += 1
+        except BaseException as e:
+            self.error = e
+            while not self._drained and inq.get() is not _END:  # unblock upstream stages
+                pass
+        finally:
+            self.elapsed_s = time.perf_counter() - t_start
+            outq.put(_END)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_s": round(self.busy_s, 3),
+            "wait_s": round(self.wait_s, 3),
+            "items_per_s": round(self.items_in / self.busy_s, 1) if self.busy_s > 0 else None,
+        }
+
+
+def run_stages(source: Iterable[Any], stages: List[Stage], queue_size: int = 8) -> List[Any]:
+    """Run `stages` as a threaded chain fed from `source`; returns the last stage's outputs."""
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    threads = [threading.Thread(target=s.run, args=(queues[i], queues[i + 1]), name=f"stage-{s.name}", daemon=True)
+               for i, s in enumerate(stages)]
+    for t in threads:
+        t.start()
+    try:
+        for item in source:
+            if stages[0].error is not None:
+                break
+            queues[0].put(item)
+    finally:
+        queues[0].put(_END)
+    results = []
+    while True:
+        item = queues[-1].get()
+        if item is _END:
+            break
+        results.append(item)
+    for t in threads:
+        t.join()
+    for s in stages:
+        if s.error is not None:
+            raise s.error
+    return results
+
+
+def refresh(html_glob: str = str(Path(HTML_DIR) / "*.html"), backend: str = VECTOR_BACKEND,
+            write_json: bool = True, full: bool = False, partial: bool = False,
+            parse_cache_dir: str = PARSE_CACHE_DIR,
+            embed_batch: int = EMBED_BATCH_SIZE, upsert_batch: int = UPSERT_BATCH_SIZE,
+            queue_size: int = 8, defaults=DEFAULTS) -> Dict[str, Any]:
+    """
+    Sync every page matching `html_glob` into the index in one streaming pass.
+
+    With partial=True the pages are a subset: programmes of other pages stay
+    in the index (and in the alias table) instead of being treated as removed.
+    Raises RuntimeError for a partial refresh after an embed model change.
+
+    Returns a summary: per-stage stats, manifest counts (added / updated /
+    removed chunks, programmes changed / unchanged / removed), JSON files
+    written and whether a new index version was published.
+    """
+    from .index.embedder import encode, embed_vectors_id  # heavy import, only when refreshing
+
+    out_dir = index_dir(backend)
+    os.makedirs(out_dir, exist_ok=True)
+    planner = BuildPlanner(load_manifest(out_dir), embed_vectors_id(), full=full, partial=partial)
+    cache = ParseCache(parse_cache_dir) if parse_cache_dir else None
+    if cache is not None:
+        cache.prune()
+    programmes: List[Dict[str, Any]] = []
+    written: List[str] = []
+    store: Dict[str, Any] = {}  # client / collection, opened on the first write
+
+    def collection():
+        if "col" not in store:
+            store["client"], store["col"] = open_for_build(backend)
+        return store["client"], store["col"]
+
+    def load(paths):
+        for path in paths:
+            yield Path(path), load_html(path)
+
+    def parse(pages):
+        for path, html in pages:
+            mini = cache.extract(html)[0] if cache is not None else extract_sections(html)
+            yield path, mini
+
+    def normalize(items):
+        for path, mini in items:
+            yield programme_from_sections(path, mini, defaults)
+
+    def validate(payloads):
+        for p in payloads:
+            validate_programme(p, str(SCHEMA_PATH))
+            if write_json and write_if_changed(JSON_DIR, p):
+                written.append(p["id"])
+            programmes.append(p)
+            yield p
+
+    def chunk(payloads):
+        for p in payloads:
+            chunks, stale = planner.add(p)
+            if chunks or stale:
+                yield chunks, stale
+
+    def embed(changes):
+        # batch across programmes so encode() sees full, length-sorted batches
+        pending, stale = [], []
+        for chunks, gone in changes:
+            pending.extend(chunks)
+            stale.extend(gone)
+            if len(pending) >= embed_batch:
+                yield pending, encode([c["text"] for c in pending], batch_size=embed_batch), stale
+                pending, stale = [], []
+        if pending or stale:
+            yield pending, (encode([c["text"] for c in pending], batch_size=embed_batch) if pending else None), stale
+
+    def upsert(batches):
+        for chunks, embeddings, stale in batches:
+            client, col = collection()
+            if chunks:
+                upsert_chunks(client, col, chunks, embeddings=embeddings, batch_size=upsert_batch)
+            if stale:
+                col.delete(ids=stale)
+            yield len(chunks), len(stale)
+
+    stages = [Stage("load", load), Stage("parse", parse), Stage("normalize", normalize),
+              Stage("validate", validate), Stage("chunk", chunk), Stage("embed", embed), Stage("upsert", upsert)]
+    t0 = time.perf_counter()
+    done = run_stages(sorted(glob.glob(html_glob)), stages, queue_size=queue_size)
+
+    removed, manifest = planner.finish()
+    if removed:
+        collection()[1].delete(ids=removed)
+    published = bool(done or removed)
+    if published:
+        if backend == "exact":
+            store["col"].save(out_dir, dtype=EXACT_DTYPE)
+        # tell running servers to reopen the collection
+        write_index_version(out_dir, backend=backend, collection=COLLECTION,
+                            chunks_upserted=sum(n for n, _ in done),
+                            chunks_deleted=sum(d for _, d in done) + len(removed),
+                            embed_model=embed_vectors_id())
+    save_manifest(out_dir, manifest)
+    aliases = build_aliases(programmes)
+    if partial:
+        # programmes outside the subset are still indexed: keep their aliases
+        aliases = {**(read_aliases(out_dir) or {}), **aliases}
+    write_aliases(out_dir, aliases)
+    return {
+        "stages": [s.stats() for s in stages],
+        "counts": planner.counts,
+        "json_written": len(written),
+        "parse_cache": {"hits": cache.hits, "misses": cache.misses} if cache is not None else None,
+        "published": published,
+        "index_dir": out_dir,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
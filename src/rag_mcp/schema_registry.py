@@ -0,0 +1,81 @@
+# src/rag_mcp/schema_registry.py
+"""
+Process-wide registry of the JSON schemas in src/rag_mcp/schemas/.
+
+Every *.schema.json is read once, checked, and compiled into a validator
+(with the draft's format checker, so "date" / "uri" are enforced where the
+checker libraries allow). Schemas can $ref each other by file name.
+"""
+import json, threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import jsonschema
+from jsonschema.validators import validator_for
+from referencing import Registry, Resource
+
+SCHEMA_DIR = Path(__file__).resolve().parent / "schemas"
+SUFFIX = ".schema.json"
+
+_registry: Optional[Registry] = None
+_validators: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _load_registry() -> Registry:
+    global _registry
+    if _registry is None:
+        resources = []
+        for fp in sorted(SCHEMA_DIR.glob(f"*{SUFFIX}")):
+            schema = json.loads(fp.read_text(encoding="utf-8"))
+            resources.append((fp.name, Resource.from_contents(schema)))
+        _registry = Registry().with_resources(resources)
+    return _registry
+
+
+def _key(name: str) -> str:
+    """'programme', 'programme.schema.json' or a path -> 'programme.schema.json'."""
+    base = Path(name).name
+    return base if base.endswith(SUFFIX) else base + SUFFIX
+
+
+def get_validator(name: str):
+    """Compiled validator for schema `name` (built on first use, then shared)."""
+    key = _key(name)
+    v = _validators.get(key)
+    if v is not None:
+        return v
+    with _lock:
+        v = _validators.get(key)
+        if v is None:
+            registry = _load_registry()
+            try:
+                schema = registry.contents(key)
+            except Exception as e:
+                raise KeyError(f"[RAG] Unknown schema '{name}' (looked for {SCHEMA_DIR / key}).") from e
+            cls = validator_for(schema)
+            cls.check_schema(schema)
+            v = _validators[key] = cls(schema, registry=registry, format_checker=cls.FORMAT_CHECKER)
+    return v
+
+
+def validate(name: str, obj: Any) -> None:
+    """Raise jsonschema.ValidationError (the most relevant error) if `obj` does not match."""
+    error = jsonschema.exceptions.best_match(get_validator(name).iter_errors(obj))
+    if error is not None:
+        raise error
+
+
+def errors(name: str, obj: Any, limit: int = 5) -> List[str]:
+    """Up to `limit` human-readable violations ([] when valid)."""
+    out = []
+    for e in get_validator(name).iter_errors(obj):
+        where = "/".join(str(p) for p in e.absolute_path) or "<root>"
+        out.append(f"{where}: {e.message}")
+        if len(out) >= limit:
+            break
+    return out
+
+
+def schema_names() -> List[str]:
+    return sorted(p.name[: -len(SUFFIX)] for p in SCHEMA_DIR.glob(f"*{SUFFIX}"))
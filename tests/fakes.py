@@ -0,0 +1,28 @@
+import numpy as np
+
+
+def seeded_vector(text, dim=8):
+    """Unit vector seeded by the lowercased text: case variants embed identically."""
+    v = np.random.default_rng(sum(map(ord, text.lower()))).normal(size=dim)
+    return v / np.linalg.norm(v)
+
+
+class FakeEmbedder:
+    """
+    Deterministic stand-in for the SentenceTransformer (no weights needed).
+
+    `vector(text)` gives each row (default seeded_vector); the texts of
+    every encode() call are kept in `batches`.
+    """
+
+    def __init__(self, vector=seeded_vector):
+        self.vector = vector
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return len(self.vector(""))
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, convert_to_numpy=True, **kw):
+        texts = list(texts)
+        self.batches.append(texts)
+        return np.array([self.vector(t) for t in texts], dtype=np.float32)
@@ -0,0 +1,40 @@
+import pytest
+
+
+def test_micro_batcher_coalesces_concurrent_calls(monkeypatch):
+    import threading
+    from src.rag_mcp.index.batching import MicroBatcher
+
+    passes = []
+
+    def fn(texts):
+        passes.append(list(texts))
+        if "boom" in texts:
+            raise ValueError("bad input")
+        return [t.upper() for t in texts]
+
+    b = MicroBatcher("t", fn, max_batch=8, max_wait_ms=200, bucket_tokens=4)
+    calls = [["a b"], ["c", "d e f g h i j"], ["k"]]
+    futs = [b.submit(c) for c in calls]  # queued before the worker's wait runs out
+    assert [f.result(5) for f in futs] == [["A B"], ["C", "D E F G H I J"], ["K"]]
+    # short items share one pass, the 7-word one gets its own bucket
+    assert sorted(map(sorted, passes)) == [["a b", "c", "k"], ["d e f g h i j"]]
+    stats = b.stats()
+    assert (stats["requests"], stats["forward_passes"]) == (3, 2)
+    assert stats["batch_size"]["count"] == 2 and stats["queue_wait_ms"]["count"] == 3
+
+    # a failing request does not fail the ones it was batched with
+    ok, bad = b.submit(["x"]), b.submit(["boom"])
+    assert ok.result(5) == ["X"]
+    with pytest.raises(ValueError):
+        bad.result(5)
+
+    # disabled: runs inline, one pass per call
+    inline = MicroBatcher("i", fn, max_wait_ms=0)
+    passes.clear()
+    threads = [threading.Thread(target=inline, args=([t],)) for t in "pq"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(passes) == [["p"], ["q"]]
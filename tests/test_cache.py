@@ -0,0 +1,97 @@
+import time
+from src.rag_mcp.cache import LRUCache
+
+
+def test_lru_evicts_by_bytes_and_counts():
+    c = LRUCache(max_bytes=40)
+    c.put("a", "x" * 15)  # 17 bytes serialized
+    c.put("b", "y" * 15)
+    assert c.get("a") == "x" * 15  # a is now most recent
+    c.put("c", "z" * 15)           # evicts b
+    assert c.get("b") is None
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["evictions"], s["entries"]) == (1, 1, 1, 2)
+    assert s["bytes"] <= 40
+
+
+def test_lru_ttl_and_copies():
+    c = LRUCache(max_bytes=1000, ttl=0.01)
+    c.put("k", {"results": [1]})
+    got = c.get("k")
+    got["results"].append(2)
+    assert c.get("k") == {"results": [1]}
+    time.sleep(0.02)
+    assert c.get("k") is None
+    assert c.stats()["expirations"] == 1
+
+
+def test_search_cache_key_ignores_whitespace_and_punctuation_but_not_case(monkeypatch):
+    from src.rag_mcp.mcp import tools
+    calls = []
+    monkeypatch.setattr(tools, "_RESULT_CACHE", LRUCache(10_000))
+    monkeypatch.setattr(tools, "_get_col", lambda: None)
+    monkeypatch.setattr(tools, "_search_many", lambda col, qs, k: calls.extend(qs) or [{"results": []} for _ in qs])
+    tools.search("Fees for BSc CS?", top_k=3)
+    tools.search("  Fees for BSc CS ", top_k=3)
+    tools.search("Fees for BSc CS", top_k=4)
+    assert len(calls) == 2
+    # "cs" is a word, "CS" an acronym: they may route differently, so they are cached apart
+    out = tools.search_batch(["CS fees", "CS fees!", "cs fees", "Fees for BSc CS"], top_k=3)
+    assert calls[2:] == ["CS fees", "cs fees"]
+    assert [r["query"] for r in out["results"]] == ["CS fees", "CS fees!", "cs fees", "Fees for BSc CS"]
+
+
+def test_semantic_cache_needs_similarity_and_same_tag():
+    import numpy as np
+    from src.rag_mcp.cache import SemanticCache
+    c = SemanticCache(max_entries=2, threshold=0.9)
+    a = np.array([1.0, 0.0]); near = np.array([0.99, 0.141]); far = np.array([0.0, 1.0])
+    c.put(a, ("fees", None, "CS"), {"results": ["cs-fees"]})
+    assert c.lookup(near, ("fees", None, "CS")) == {"results": ["cs-fees"]}
+    assert c.lookup(near, ("fees", None, "IT")) is None   # routed elsewhere
+    assert c.lookup(far, ("fees", None, "CS")) is None    # not similar enough
+    c.put(far, "t2", 2)
+    c.put(near, "t3", 3)  # full: evicts the least recently used entry (the CS one)
+    assert c.lookup(a, ("fees", None, "CS")) is None
+    assert c.lookup(far, "t2") == 2
+    s = c.stats()
+    assert (s["hits"], s["lookups"], s["evictions"], s["entries"]) == (2, 5, 1, 2)
+
+
+def test_rerank_scores_only_unseen_pairs(monkeypatch, tmp_path):
+    from src.rag_mcp.index import reranker
+    seen = []
+
+    class FakeModel:
+        def predict(self, pairs):
+            seen.append(len(pairs))
+            return [float(len(t)) for _, t in pairs]
+
+    monkeypatch.setattr(reranker, "_score_cache", LRUCache(10_000))
+    monkeypatch.setattr(reranker, "get_reranker", lambda: FakeModel())
+    out = reranker.rerank("CS fees?", [{"text": "a"}, {"text": "bbb"}])
+    assert [c["text"] for c in out] == ["bbb", "a"]
+    reranker.rerank("cs fees", [{"text": "a"}, {"text": "cc"}, {"text": "bbb"}])
+    assert seen == [2, 1]
+
+    path = str(tmp_path / "scores.json")
+    assert reranker.save_score_cache(path) == 3
+    warm = LRUCache(10_000)
+    assert warm.load(path) == 3
+    monkeypatch.setattr(reranker, "_score_cache", warm)
+    reranker.rerank("cs fees", [{"text": "cc"}])
+    assert seen == [2, 1]
+
+
+def test_rerank_score_keys_depend_on_model_and_backend(monkeypatch):
+    from src.rag_mcp.index import reranker
+    cand = {"text": "fees", "metadata": {"content_hash": "h"}}
+    monkeypatch.setattr(reranker, "RERANK_BACKEND", "torch")
+    torch_key = reranker._pair_key("q", cand)
+    monkeypatch.setattr(reranker, "RERANK_BACKEND", "onnx-int8")
+    int8_key = reranker._pair_key("q", cand)
+    monkeypatch.setattr(reranker, "RERANK_MODEL", "models/other-reranker")
+    other_key = reranker._pair_key("q", cand)
+    assert len({torch_key, int8_key, other_key}) == 3
+    assert int8_key.startswith("ms-marco-MiniLM-L6-v2@onnx-int8\x1f")
+
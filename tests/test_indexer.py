@@ -1,4 +1,5 @@
 import json, glob
+import pytest
 from pathlib import Path
 from src.rag_mcp.index.chunker import make_chunks
 from src.rag_mcp.config import JSON_DIR
@@ -8,3 +9,65 @@ def test_chunk_counts():
         p = json.loads(Path(fp).read_text(encoding="utf-8"))
         chunks = make_chunks(p)
         assert any(c["metadata"]["section"]=="fees" for c in chunks)
+
+def test_programme_aliases_resolve_common_names():
+    from src.rag_mcp.index.aliases import build_aliases, ProgrammeMatcher
+    progs = [json.loads(Path(fp).read_text(encoding="utf-8")) for fp in glob.glob(str(Path(JSON_DIR) / "*.json"))]
+    m = ProgrammeMatcher(build_aliases(progs))
+    cs = [p["programme_name"] for p in progs if p["id"].endswith("in-computer-science-sunway-university")][0]
+    bm = [p["programme_name"] for p in progs if p["id"].endswith("in-business-management-sunway-university")][0]
+    assert m.match("How much is BSc Computer Science per year?") == [cs]
+    assert m.match("fees for BSc CS") == [cs]
+    assert m.match("Business Mgmt overview") == [bm]
+    assert len(m.match("IT fees")) == 2  # IT and IT (Networking): left to the dense tie-break
+    assert m.match("is it expensive?") == []
+    assert m.match("fees for a bsc in cs") == [cs]
+    # "in" is not a degree word: short lowercase acronyms after it are plain words
+    assert m.match("what are the fees if I can finish in as little as three years") == []
+    assert m.match("what modules are in it") == []
+    assert m.match("fee in me") == []
+
+def test_incremental_build_plan():
+    from src.rag_mcp.index.manifest import plan_build
+    progs = [json.loads(Path(fp).read_text(encoding="utf-8")) for fp in sorted(glob.glob(str(Path(JSON_DIR) / "*.json")))]
+    chunks, stale, manifest, counts = plan_build({"embed_model": None, "programmes": {}}, progs, "m")
+    assert counts["programmes_changed"] == len(progs) and counts["added"] == len(chunks) and not stale
+
+    # nothing changed: nothing to embed or delete
+    chunks2, stale2, manifest2, counts2 = plan_build(manifest, progs, "m")
+    assert chunks2 == [] and stale2 == [] and counts2["programmes_unchanged"] == len(progs)
+    assert manifest2 == manifest
+
+    # one programme loses a year of structure, another disappears
+    edited = json.loads(json.dumps(progs[0]))
+    assert len(edited.get("structure") or []) > 1, "fixture needs a multi-year programme"
+    edited["structure"].pop()
+    edited["source_hash"] = "changed"
+    chunks3, stale3, _, counts3 = plan_build(manifest, [edited] + progs[2:], "m")
+    assert {c["metadata"]["programme_name"] for c in chunks3} == {edited["programme_name"]}
+    assert counts3["added"] == 0 and counts3["updated"] == len(chunks3)
+    assert set(stale3) == (set(manifest["programmes"][edited["id"]]["chunk_ids"]) - {c["id"] for c in chunks3}) \
+        | set(manifest["programmes"][progs[1]["id"]]["chunk_ids"])
+    assert counts3["programmes_removed"] == 1 and counts3["removed"] == len(stale3)
+
+    # a different embedding model rebuilds everything
+    chunks4, _, _, _ = plan_build(manifest, progs, "other")
+    assert len(chunks4) == len(chunks)
+
+    # ...but --only cannot switch models: the rest of the index would keep the old vectors
+    with pytest.raises(RuntimeError, match="partial build"):
+        plan_build(manifest, progs[:1], "other", partial=True)
+    assert plan_build(manifest, progs[:1], "m", partial=True)[3]["programmes_unchanged"] == 1
+
+def test_backend_switch_rebuilds_the_index():
+    from src.rag_mcp.index.embedder import embed_vectors_id
+    from src.rag_mcp.index.manifest import plan_build
+    torch_id = embed_vectors_id("models/all-MiniLM-L6-v2", "torch")
+    int8_id = embed_vectors_id("models/all-MiniLM-L6-v2", "onnx-int8")
+    assert (torch_id, int8_id) == ("all-MiniLM-L6-v2", "all-MiniLM-L6-v2@onnx-int8")  # torch keeps old manifests valid
+
+    progs = [json.loads(Path(fp).read_text(encoding="utf-8")) for fp in sorted(glob.glob(str(Path(JSON_DIR) / "*.json")))]
+    chunks, _, manifest, _ = plan_build({"embed_model": None, "programmes": {}}, progs, torch_id)
+    assert len(plan_build(manifest, progs, int8_id)[0]) == len(chunks)
+    with pytest.raises(RuntimeError, match="partial build"):
+        plan_build(manifest, progs[:1], int8_id, partial=True)
@@ -0,0 +1,89 @@
+import pytest
+from pathlib import Path
+
+
+def test_model_registry_loads_each_model_once(monkeypatch):
+    import threading, time
+    from src.rag_mcp.index import embedder, models
+    from src.rag_mcp.mcp import tools
+
+    loads = []
+
+    def load(path, backend):
+        loads.append((path, backend))
+        time.sleep(0.05)  # give concurrent callers time to race
+        return object()
+
+    monkeypatch.setattr(models, "_models", {})
+    monkeypatch.setattr(models, "_info", {})
+    monkeypatch.setattr(models, "_threads", {"intra_op": 1, "inter_op": 1})
+    monkeypatch.setattr(models, "_LOADERS", {"embedder": load, "reranker": load})
+    monkeypatch.setattr(embedder, "_embedder", None)
+    monkeypatch.setattr(tools, "_MODEL", None)
+    monkeypatch.setattr(tools, "PROGRAMME_NAMES", [])
+
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(embedder.get_embedder())) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    tools._ensure_model_and_programmes()
+    assert len(loads) == 1 and all(m is got[0] for m in got) and tools._MODEL is got[0]
+
+    models.get_model("reranker", "/models/ce")
+    stats = models.model_stats()
+    assert [(m["kind"], m["model"]) for m in stats["models"]] == [("embedder", embedder.embed_model_id()), ("reranker", "ce")]
+    assert stats["threads"] == {"intra_op": 1, "inter_op": 1}
+
+
+def test_onnx_exports_are_reused_from_the_model_folder(tmp_path, monkeypatch):
+    from src.rag_mcp.index import models
+
+    def no_export(kind):
+        raise AssertionError("cached export must not be rebuilt")
+
+    (tmp_path / "onnx").mkdir()
+    (tmp_path / "onnx" / "model.onnx").write_bytes(b"x")
+    (tmp_path / "onnx" / "model_qint8_avx2.onnx").write_bytes(b"x")
+    monkeypatch.setattr(models, "_model_class", lambda kind: type("M", (), {"__init__": no_export}))
+    assert models.ensure_onnx("embedder", str(tmp_path), "onnx") == "onnx/model.onnx"
+    assert models.ensure_onnx("reranker", str(tmp_path), "onnx-int8", "avx2") == "onnx/model_qint8_avx2.onnx"
+    assert models.onnx_file("torch") is None
+
+
+def _local_model(tmp_path, name):
+    """Copy of models/<name> (exports are written next to the weights), or skip without weights."""
+    import shutil
+    from src.rag_mcp.config import MODELS_DIR
+    src = Path(MODELS_DIR) / name
+    if not any((src / f).exists() for f in ("model.safetensors", "pytorch_model.bin")):
+        pytest.skip(f"no local weights for {name}")
+    return str(shutil.copytree(src, tmp_path / name))
+
+
+def test_onnx_backends_match_torch(tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum.onnxruntime")
+    import numpy as np
+    from src.rag_mcp.index.models import load_model
+
+    texts = ["How much is BSc Computer Science per year?", "Year 2 modules for Information Systems",
+             "The programme is offered in the March and August intakes."]
+    path = _local_model(tmp_path, "all-MiniLM-L6-v2")
+    ref = load_model("embedder", path, "torch").encode(texts, normalize_embeddings=True)
+    for backend, min_cos in (("onnx", 0.999), ("onnx-int8", 0.95)):
+        got = load_model("embedder", path, backend).encode(texts, normalize_embeddings=True)
+        assert np.min(np.sum(ref * got, axis=1)) > min_cos, backend
+    assert (Path(path) / "onnx" / "model.onnx").exists()
+
+    q = "tuition fees for computer science"
+    pairs = [(q, "Computer Science tuition fees are RM 40,000 per year."),
+             (q, "Psychology students take a research methods module in Year 2."),
+             (q, "The campus library opens at 8am.")]
+    path = _local_model(tmp_path, "ms-marco-MiniLM-L6-v2")
+    ref = np.asarray(load_model("reranker", path, "torch").predict(pairs))
+    for backend in ("onnx", "onnx-int8"):
+        got = np.asarray(load_model("reranker", path, backend).predict(pairs))
+        assert int(np.argmax(got)) == int(np.argmax(ref)), backend
+    assert (Path(path) / "onnx" / "model.onnx").exists()
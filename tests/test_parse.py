@@ -0,0 +1,57 @@
+import glob
+from pathlib import Path
+
+import pytest
+
+from src.rag_mcp.config import HTML_DIR
+from src.rag_mcp.ingest.parse_sunway import extract_sections, extract_sections_multipass
+
+SYNTHETIC = [
+    # overview from <section id="overview">, years out of order, career list, fees note
+    """<html><body><section id="overview"><p>Learn things.</p></section>
+    <h3>Year 2</h3><ul><li>B1</li><li> B2 </li></ul><h4>Year 1 modules</h4><ul><li>A1</li></ul>
+    <div class="coursedurationbox"><span class="coursedurationfield"> 3 years </span></div>
+    <div class="views-field-field-intakes"><span class="field-content">March, August</span></div>
+    <div class="views-field-field-career-prospects"><ul><li>Analyst</li><li><ul><li>Nested</li></ul></li></ul></div>
+    <div class="views-field-field-malaysian-student-fees">RM 40,000. Fees are indicative only.</div>
+    </body></html>""",
+    # <a name="Overview"> followed by paragraphs; a field-content outside the intakes field
+    """<html><body><span class="field-content">not intakes</span><a name="Overview"></a>
+    <p>First.</p><p>Second.</p><div>stop</div><h2>Year 3</h2><p>no list yet</p><ul><li>C</li></ul></body></html>""",
+    # heading titled "Programme Overview"
+    """<html><body><h2>Programme Overview</h2>text <p>Para</p><ul><li>x</li></ul><h2>Next</h2></body></html>""",
+    # body-field fallback inside article, and an empty id*=overview node
+    """<html><body><div id="OverviewBox"></div><article><section class="field--name-body">Body text</section></article></body></html>""",
+    # last resort: first paragraphs in <main>
+    """<html><body><main><p>one</p><p></p><p>two</p></main></body></html>""",
+    "<html><body></body></html>",
+]
+
+
+@pytest.mark.parametrize("html", SYNTHETIC)
+def test_single_pass_matches_multipass_synthetic(html):
+    assert extract_sections(html) == extract_sections_multipass(html)
+
+
+def test_single_pass_matches_multipass_on_pages():
+    pages = sorted(glob.glob(str(Path(HTML_DIR) / "*.html")))[:5]
+    assert pages
+    for fp in pages:
+        html = Path(fp).read_text(encoding="utf-8")
+        assert extract_sections(html) == extract_sections_multipass(html), fp
+
+
+def test_parse_cache_hits_and_version_invalidation(tmp_path, monkeypatch):
+    from src.rag_mcp.ingest import parse_cache
+    html = SYNTHETIC[0]
+    cache = parse_cache.ParseCache(str(tmp_path))
+    assert cache.extract(html) == (extract_sections(html), False)
+    assert cache.extract(html) == (extract_sections(html), True)
+    assert cache.extract(html + " ")[1] is False  # any byte change is a new key
+    assert (cache.hits, cache.misses, cache.entries()) == (1, 2, 2)
+
+    # an edited parse_sunway.py gives a new version: old entries are not served and get pruned
+    monkeypatch.setattr(parse_cache, "PARSER_VERSION", "edited")
+    fresh = parse_cache.ParseCache(str(tmp_path))
+    assert fresh.extract(html)[1] is False
+    assert fresh.prune() == 1 and fresh.entries() == 1
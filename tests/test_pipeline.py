@@ -0,0 +1,71 @@
+import glob, shutil
+from datetime import date
+from pathlib import Path
+
+from fakes import FakeEmbedder
+from src.rag_mcp.config import HTML_DIR
+
+
+def test_streaming_refresh_is_incremental(tmp_path, monkeypatch):
+    from src.rag_mcp import pipeline
+    from src.rag_mcp.ingest import programme
+    from src.rag_mcp.index import embedder, store
+    from src.rag_mcp.index.store_exact import ExactCollection
+
+    monkeypatch.setattr(embedder, "_embedder", FakeEmbedder())
+    monkeypatch.setattr(embedder, "EMBED_CACHE_DIR", "")
+    monkeypatch.setattr(store, "EXACT_DIR", str(tmp_path / "exact"))
+    pages = tmp_path / "html"
+    pages.mkdir()
+    for fp in sorted(glob.glob(str(Path(HTML_DIR) / "*.html")))[:3]:
+        shutil.copy(fp, pages)
+
+    def run():
+        return pipeline.refresh(str(pages / "*.html"), backend="exact", write_json=False,
+                                parse_cache_dir=str(tmp_path / "pc"), embed_batch=4, queue_size=2)
+
+    first = run()
+    n = ExactCollection.load(str(tmp_path / "exact")).count()
+    assert first["published"] and first["counts"]["programmes_changed"] == 3
+    assert first["counts"]["added"] == n > 0
+    stages = {s["stage"]: s for s in first["stages"]}
+    assert stages["load"]["items_in"] == stages["validate"]["items_out"] == 3
+    assert stages["upsert"]["items_in"] >= 2  # embed flushed in batches while parsing continued
+
+    second = run()
+    assert not second["published"] and second["counts"]["programmes_unchanged"] == 3
+    assert second["parse_cache"] == {"hits": 3, "misses": 0}
+    assert {s["stage"]: s["items_in"] for s in second["stages"]}["embed"] == 0
+
+    # a run on a later day re-stamps last_fetched, but no content changed
+    monkeypatch.setattr(programme, "date", type("D", (), {"today": staticmethod(lambda: date(2099, 1, 1))}))
+    next_day = run()
+    assert not next_day["published"] and next_day["counts"]["programmes_unchanged"] == 3
+
+    # a one-page subset leaves the other programmes (and their aliases) alone
+    from src.rag_mcp.index.aliases import read_aliases
+    subset = pipeline.refresh(str(sorted(pages.glob("*.html"))[0]), backend="exact", write_json=False, partial=True,
+                              parse_cache_dir=str(tmp_path / "pc"), full=True)
+    assert subset["counts"]["programmes_changed"] == 1 and subset["counts"]["programmes_removed"] == 0
+    assert ExactCollection.load(str(tmp_path / "exact")).count() == n
+    assert len(read_aliases(str(tmp_path / "exact"))) == 3
+
+    next(pages.glob("*.html")).unlink()
+    third = run()
+    assert third["published"] and third["counts"]["programmes_removed"] == 1
+    assert ExactCollection.load(str(tmp_path / "exact")).count() == n - third["counts"]["removed"]
+
+
+def test_stage_error_propagates_without_hanging():
+    import pytest
+    from src.rag_mcp.pipeline import Stage, run_stages
+
+    def boom(items):
+        for i in items:
+            if i == 3:
+                raise ValueError("bad item")
+            yield i
+
+    with pytest.raises(ValueError):
+        run_stages(range(100), [Stage("a", lambda xs: (x for x in xs)), Stage("boom", boom),
+                                Stage("c", lambda xs: (x for x in xs))], queue_size=1)
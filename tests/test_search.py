@@ -0,0 +1,180 @@
+import pytest
+from fakes import FakeEmbedder
+from src.rag_mcp.mcp import tools
+from src.rag_mcp.index.store_chroma import SharedCollection, get_collection, write_index_version
+
+
+def test_index_built_with_other_model_is_rejected(tmp_path, monkeypatch):
+    get_collection(str(tmp_path), "test_col")
+    write_index_version(str(tmp_path), embed_model="some-other-model")
+    monkeypatch.setattr(tools, "_COLLECTION", SharedCollection(str(tmp_path), "test_col"))
+    with pytest.raises(RuntimeError, match="some-other-model"):
+        tools._get_col()
+
+
+def _toy_collection(tmp_path):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    _, col = get_collection(str(tmp_path), "test_col")
+    ids, metas = [], []
+    for p in ("Alpha", "Beta", "Gamma"):
+        ids.append(f"{p}#fees"); metas.append({"programme_name": p, "section": "fees"})
+        for y in (1, 2, 3):
+            ids.append(f"{p}#y{y}"); metas.append({"programme_name": p, "section": "structure", "year": y})
+    emb = rng.normal(size=(len(ids), 8))
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    col.upsert(ids=ids, documents=ids, metadatas=metas, embeddings=emb.tolist())
+    return col, rng
+
+
+@pytest.mark.parametrize("overfetch", [512, 3])
+@pytest.mark.parametrize("route", [
+    ("fees", None, "Beta"),
+    ("structure", 2, "Gamma"),
+    ("structure", 9, "Alpha"),   # no such year -> programme tier
+    ("overview", None, "Delta"),  # unknown programme -> unfiltered tier
+    (None, None, None),
+])
+def test_single_pass_matches_cascade(tmp_path, monkeypatch, overfetch, route):
+    col, rng = _toy_collection(tmp_path)
+    monkeypatch.setattr(tools, "RETRIEVAL_OVERFETCH", overfetch)
+    q = rng.normal(size=8)
+    q /= (q ** 2).sum() ** 0.5
+    n_pre = 2
+    cascade = tools._query_with_backoff(col, q, n_pre, *route)
+    single = tools._query_single_pass(col, q, n_pre, *route, total=col.count())
+    assert single["ids"][0] == cascade["ids"][0]
+
+
+def test_adaptive_rerank_skips_decisive_and_shrinks_to_budget(monkeypatch):
+    from src.rag_mcp.index import reranker
+
+    def fake_score_many(items):  # reverses the dense order
+        for _, cands in items:
+            for c in cands:
+                c["_score_rerank"] = -c["score"]
+        return [len(cands) for _, cands in items]
+
+    monkeypatch.setattr(reranker, "_score_many", fake_score_many)
+    close = [{"text": str(i), "score": 0.50 - i * 0.01} for i in range(6)]
+
+    out, info = reranker.adaptive_rerank("q", [{"text": "a", "score": 0.9}, {"text": "b", "score": 0.5}], 5)
+    assert (info["ran"], info["reason"]) == (False, "dense_margin")
+    out, info = reranker.adaptive_rerank("q", [dict(c) for c in close], 5, confident=True)
+    assert (info["ran"], info["reason"]) == (False, "confident_route")
+
+    out, info = reranker.adaptive_rerank("q", [dict(c) for c in close], 5)
+    assert (info["ran"], info["pairs"]) == (True, 6)
+    assert [c["text"] for c in out] == ["5", "4", "3", "2", "1", "0"]
+
+    monkeypatch.setattr(reranker, "RERANK_BUDGET_MS", 3.0)
+    monkeypatch.setattr(reranker, "_pair_ms", 1.0)
+    out, info = reranker.adaptive_rerank("q", [dict(c) for c in close], 2)
+    assert (info["reason"], info["pairs"]) == ("budget", 3)
+    assert [c["text"] for c in out] == ["2", "1", "0", "3", "4", "5"]
+
+
+def _wire_toy_pipeline(tmp_path, monkeypatch):
+    from src.rag_mcp.cache import LRUCache, SemanticCache
+    from src.rag_mcp.index import reranker
+    from src.rag_mcp.index.aliases import ProgrammeMatcher, build_aliases
+    _toy_collection(tmp_path)
+    write_index_version(str(tmp_path))
+    names = ["Alpha", "Beta", "Gamma"]
+    model = FakeEmbedder()
+    predicts = []
+
+    class FakeCrossEncoder:
+        def predict(self, pairs):
+            predicts.append(len(pairs))
+            return [float(len(q) % 7 - len(t) % 5) for q, t in pairs]
+
+    monkeypatch.setattr(tools, "_COLLECTION", SharedCollection(str(tmp_path), "test_col"))
+    monkeypatch.setattr(tools, "PROGRAMME_NAMES", names)
+    monkeypatch.setattr(tools, "_MATCHER", ProgrammeMatcher(build_aliases({"programme_name": n} for n in names)))
+    monkeypatch.setattr(tools, "_MODEL", model)
+    monkeypatch.setattr(tools, "_PROG_EMB", model.encode(names))
+    monkeypatch.setattr(tools, "_RESULT_CACHE", LRUCache(0))
+    monkeypatch.setattr(tools, "_SEMANTIC_CACHE", SemanticCache(0, 1.0))
+    monkeypatch.setattr(reranker, "_score_cache", LRUCache(0))
+    monkeypatch.setattr(reranker, "get_reranker", lambda: FakeCrossEncoder())
+    model.batches.clear()
+    return model, predicts
+
+
+def test_search_batch_matches_single_searches_with_one_model_pass(tmp_path, monkeypatch):
+    model, predicts = _wire_toy_pipeline(tmp_path, monkeypatch)
+    queries = ["Beta fees", "year 2 modules for Gamma", "tell me something", "alpha structure"]
+    singles = [tools.search(q, top_k=3) for q in queries]
+    model.batches.clear(); predicts.clear()
+
+    batch = tools.search_batch(queries, top_k=3)
+    assert [r["response"] for r in batch["results"]] == singles
+    assert [len(b) for b in model.batches] == [len(queries)]
+    assert len(predicts) <= 1
+
+
+def test_fee_question_answered_from_fact_table_without_models(tmp_path, monkeypatch):
+    from src.rag_mcp.cache import LRUCache
+
+    class NoModel:
+        def encode(self, *a, **kw):
+            raise AssertionError("fast path must not run the embedder")
+
+    get_collection(str(tmp_path), "test_col")
+    monkeypatch.setattr(tools, "_COLLECTION", SharedCollection(str(tmp_path), "test_col"))
+    monkeypatch.setattr(tools, "_RESULT_CACHE", LRUCache(0))
+    monkeypatch.setattr(tools, "_MODEL", NoModel())
+    out = tools.search("How much are the fees for BSc Computer Science?")
+    assert out["fast_path"]["fact"] == "fees"
+    [r] = out["results"]
+    assert r["id"].endswith("in-computer-science-sunway-university#fees")
+    assert r["metadata"]["facts"]["fees"]["malaysian_rm"]
+    out = tools.search("How long is the Business Mgmt degree?")
+    assert out["fast_path"]["fact"] == "duration"
+    assert out["results"][0]["metadata"]["facts"]["duration"]
+    # two programmes named: one row would drop the other, so the query goes to retrieval
+    for q in ("fees for Computer Science and Psychology", "Is Psychology more expensive than CS?"):
+        with pytest.raises(AssertionError, match="fast path must not run"):
+            tools.search(q)
+
+
+def test_result_cache_keeps_case_variants_apart(tmp_path, monkeypatch):
+    from src.rag_mcp.cache import LRUCache
+    from src.rag_mcp.index.aliases import ProgrammeMatcher
+    _wire_toy_pipeline(tmp_path, monkeypatch)
+    # "IT" is Beta's acronym; lowercase "it" is just a word and falls through to dense routing
+    monkeypatch.setattr(tools, "_MATCHER", ProgrammeMatcher({
+        "Alpha": [{"alias": "Alpha", "primary": True}],
+        "Beta": [{"alias": "Beta", "primary": True}, {"alias": "IT", "primary": False, "acronym": True}],
+        "Gamma": [{"alias": "Gamma", "primary": True}]}))
+    assert tools._route_programme("IT fees")[1] == "lexical"
+    assert tools._route_programme("it fees")[1] != "lexical"
+    fresh = {q: tools.search(q, top_k=3) for q in ("IT fees", "it fees")}
+
+    monkeypatch.setattr(tools, "_RESULT_CACHE", LRUCache(1 << 20))
+    for q in ("IT fees", "it fees", "  IT fees!"):
+        assert tools.search(q, top_k=3)["results"] == fresh[q.strip(" !")]["results"]
+
+
+def test_cache_hits_do_not_report_a_rerank(tmp_path, monkeypatch):
+    from src.rag_mcp.cache import LRUCache, SemanticCache
+    from src.rag_mcp.index import reranker
+    _, predicts = _wire_toy_pipeline(tmp_path, monkeypatch)
+    monkeypatch.setattr(reranker, "RERANK_POLICY", "always")
+    cached = {"ran": False, "reason": "cache", "pairs": 0, "pairs_scored": 0}
+
+    monkeypatch.setattr(tools, "_RESULT_CACHE", LRUCache(1 << 20))
+    first = tools.search("tell me something", top_k=3)
+    assert first["rerank"]["ran"] and first["rerank"]["pairs_scored"] > 0
+    hit = tools.search("tell me something!", top_k=3)
+    assert hit["rerank"] == cached and hit["results"] == first["results"]
+
+    # the fake embedder ignores case: same vector, same routing -> semantic-cache hit
+    monkeypatch.setattr(tools, "_RESULT_CACHE", LRUCache(0))
+    monkeypatch.setattr(tools, "_SEMANTIC_CACHE", SemanticCache(16, 0.99))
+    first = tools.search("year 2 modules for Gamma", top_k=3)
+    assert first["rerank"]["ran"]
+    n = len(predicts)
+    near = tools.search("Year 2 modules for Gamma", top_k=3)
+    assert near["rerank"] == cached and len(predicts) == n
@@ -0,0 +1,158 @@
+import io, json, sys, time, threading
+from src.rag_mcp.mcp import server
+
+
+def _run(monkeypatch, lines, max_inflight, warmup=False):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("".join(json.dumps(l) + "\n" for l in lines)))
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    server.serve_stdio(max_inflight=max_inflight, warmup=warmup)
+    return [json.loads(l) for l in out.getvalue().splitlines()]
+
+
+def test_slow_call_does_not_block_ping(monkeypatch):
+    release = threading.Event()
+
+    def slow_search(q, top_k=5):
+        release.wait(5)
+        return {"results": []}
+
+    monkeypatch.setattr(server, "rag_search", slow_search)
+    orig_ping = server._handle_ping
+
+    def ping(params):
+        release.set()  # only reached if ping was not queued behind the search
+        return orig_ping(params)
+
+    monkeypatch.setattr(server, "_handle_ping", ping)
+    out = _run(monkeypatch, [
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+         "params": {"name": "rag.search", "arguments": {"query": "fees"}}},
+        {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+    ], max_inflight=4)
+    assert [r["id"] for r in out] == [2, 1]
+    assert out[1]["result"]["structuredContent"] == {"results": []}
+
+
+def test_serial_mode_keeps_order(monkeypatch):
+    monkeypatch.setattr(server, "rag_search", lambda q, top_k=5: (time.sleep(0.05), {"results": []})[1])
+    out = _run(monkeypatch, [
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+         "params": {"name": "rag.search", "arguments": {"query": "fees"}}},
+        {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+    ], max_inflight=1)
+    assert [r["id"] for r in out] == [1, 2]
+
+
+def test_schema_validation_modes(monkeypatch):
+    monkeypatch.setattr(server, "rag_search", lambda q, top_k=5: {"results": [
+        {"id": "p#fees", "text": "t", "score": 0.5, "metadata": {"section": "fees", "last_fetched": "2025-11-12"}}]})
+    monkeypatch.setattr(server, "rag_get", lambda doc_id: {"id": doc_id, "text": "t"})  # no metadata
+    calls = [
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+         "params": {"name": "rag.search", "arguments": {"query": "fees", "top_k": 5}}},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/call",
+         "params": {"name": "rag.search", "arguments": {"query": 7}}},
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/call",
+         "params": {"name": "rag.get", "arguments": {"id": "p#fees"}}},
+    ]
+
+    monkeypatch.setattr(server, "_validation", {"mode": "strict", "rate": 0.0})
+    out = {r["id"]: r for r in _run(monkeypatch, calls, max_inflight=1)}
+    assert "result" in out[1]
+    assert out[2]["error"]["code"] == -32602 and out[2]["error"]["data"]["errors"]
+    assert out[3]["error"]["code"] == -32603 and "rag_get_response" in out[3]["error"]["data"]["detail"]
+
+    # off (and sampled, whose violations are only logged) never reject
+    monkeypatch.setattr(server, "_validation", {"mode": "sampled", "rate": 1.0})
+    monkeypatch.setattr(server, "rag_search", lambda q, top_k=5: {"results": []})
+    out = {r["id"]: r for r in _run(monkeypatch, calls, max_inflight=1)}
+    assert all("result" in r for r in out.values())
+
+
+def test_calls_wait_for_background_warmup(monkeypatch):
+    release, events = threading.Event(), []
+
+    class FakeTools:
+        def warmup(self):
+            release.wait(5)
+            events.append("warm")
+            return {"embedder": {"ms": 1.0}, "reranker": {"ms": 2.0, "error": "no model"}}
+
+    def search(q, top_k=5):
+        events.append("search")
+        return {"results": []}
+
+    monkeypatch.setattr(server, "_warmup", {"state": "off", "ms": None, "steps": {}, "error": None})
+    monkeypatch.setattr(server, "_warmup_done", threading.Event())
+    monkeypatch.setattr(server, "_tools", lambda: FakeTools())
+    monkeypatch.setattr(server, "rag_search", search)
+    orig_ping = server._handle_ping
+    pings = []
+
+    def ping(params):
+        pings.append(orig_ping(params))
+        release.set()
+        return pings[-1]
+
+    monkeypatch.setattr(server, "_handle_ping", ping)
+    out = _run(monkeypatch, [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+        {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/call",
+         "params": {"name": "rag.search", "arguments": {"query": "fees"}}},
+        {"jsonrpc": "2.0", "id": 4, "method": "ping"},
+    ], max_inflight=1, warmup=True)
+    assert [r["id"] for r in out] == [1, 2, 3, 4]
+    assert pings[0]["ready"] is False and pings[0]["warmup"]["state"] == "running"
+    assert events == ["warm", "search"]  # the call waited for warm-up instead of racing it
+    assert pings[1]["warmup"]["state"] == "degraded" and pings[1]["warmup"]["steps"]["reranker"]["error"]
+
+
+def test_server_import_defers_heavy_modules():
+    import subprocess
+    code = ("import sys, src.rag_mcp.mcp.server; "
+            "print([m for m in ('torch', 'chromadb', 'sentence_transformers', 'jsonschema') if m in sys.modules])")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_search_batch_size_is_enforced_without_schema_checks(monkeypatch):
+    monkeypatch.setattr(server, "_validation", {"mode": "off", "rate": 0.0})
+    monkeypatch.setattr(server, "rag_search_batch", lambda qs, top_k=5: {"results": [
+        {"query": q, "response": {"results": []}} for q in qs]})
+
+    def call(id_, queries):
+        return {"jsonrpc": "2.0", "id": id_, "method": "tools/call",
+                "params": {"name": "rag.search_batch", "arguments": {"queries": queries}}}
+
+    out = {r["id"]: r for r in _run(monkeypatch, [
+        call(1, ["fees"] * server.MAX_BATCH_QUERIES),
+        call(2, ["fees"] * (server.MAX_BATCH_QUERIES + 1)),
+        call(3, []),
+        call(4, ["fees", 3]),
+    ], max_inflight=1)}
+    assert "result" in out[1]
+    assert [out[i]["error"]["code"] for i in (2, 3, 4)] == [-32602] * 3
+
+
+def test_ping_reports_cache_and_retrieval_counters(monkeypatch):
+    from collections import Counter
+    from src.rag_mcp.cache import LRUCache
+    from src.rag_mcp.index import reranker
+    from src.rag_mcp.mcp import tools
+
+    monkeypatch.setattr(server, "_tools_mod", tools)
+    monkeypatch.setattr(tools, "_RESULT_CACHE", LRUCache(1 << 10))
+    monkeypatch.setattr(reranker, "_score_cache", LRUCache(1 << 10))
+    monkeypatch.setattr(tools, "_COUNTS", Counter())
+    tools._RESULT_CACHE.get("fees")
+    tools._count("tier.filtered", 2)
+    tools._count("fast_path.fees")
+
+    [r] = _run(monkeypatch, [{"jsonrpc": "2.0", "id": 1, "method": "ping"}], max_inflight=1)
+    caches = r["result"]["caches"]
+    assert set(caches) == {"result", "semantic", "rerank"}
+    assert (caches["result"]["hits"], caches["result"]["misses"], caches["result"]["evictions"]) == (0, 1, 0)
+    assert r["result"]["retrieval"] == {"tier.filtered": 2, "fast_path.fees": 1}
+
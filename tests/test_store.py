@@ -0,0 +1,106 @@
+import pytest
+
+from fakes import FakeEmbedder
+
+from src.rag_mcp.index.store_chroma import SharedCollection, get_collection, write_index_version
+
+
+def test_shared_collection_reopens_only_on_new_version(tmp_path):
+    _, col = get_collection(str(tmp_path), "test_col")
+    col.upsert(ids=["a"], documents=["a"], embeddings=[[1.0, 0.0]])
+    write_index_version(str(tmp_path))
+
+    shared = SharedCollection(str(tmp_path), "test_col")
+    first = shared.get()
+    v1 = shared.version
+    assert shared.get() is first
+
+    write_index_version(str(tmp_path))
+    second = shared.get()
+    assert shared.version != v1
+    assert second is not first
+    assert second.count() == 1
+
+    # a backend without _open() fails when constructed, not on its first request
+    from src.rag_mcp.index.store import SharedIndex
+    with pytest.raises(TypeError):
+        type("NoOpen", (SharedIndex,), {})(str(tmp_path), "test_col")
+
+
+def test_exact_backend_matches_chroma(tmp_path):
+    import numpy as np
+    from src.rag_mcp.index.store_exact import ExactCollection, SharedExactCollection
+
+    rng = np.random.default_rng(1)
+    ids = [f"p{p}#y{y}" for p in range(4) for y in range(1, 4)]
+    metas = [{"programme_name": f"P{p}", "section": "structure", "year": y} for p in range(4) for y in range(1, 4)]
+    emb = rng.normal(size=(len(ids), 16)).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+
+    _, chroma = get_collection(str(tmp_path / "chroma"), "test_col")
+    chroma.upsert(ids=ids, documents=ids, metadatas=metas, embeddings=emb.tolist())
+    exact = ExactCollection([], [], [])
+    exact.upsert(ids=ids, documents=ids, metadatas=metas, embeddings=emb.tolist())
+    exact.save(str(tmp_path / "exact"))
+    write_index_version(str(tmp_path / "exact"))
+    loaded = SharedExactCollection(str(tmp_path / "exact"), "test_col").get()
+    assert loaded.count() == len(ids)
+
+    q = emb[:3] + 0.1 * rng.normal(size=(3, 16)).astype(np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    for where in (None, {"programme_name": {"$eq": "P2"}},
+                  {"$and": [{"section": {"$eq": "structure"}}, {"year": {"$eq": 2}}]}):
+        a = chroma.query(query_embeddings=q.tolist(), n_results=5, where=where,
+                         include=["documents", "metadatas", "distances"])
+        b = loaded.query(query_embeddings=q.tolist(), n_results=5, where=where,
+                         include=["documents", "metadatas", "distances"])
+        assert a["ids"] == b["ids"]
+        assert np.allclose(a["distances"], b["distances"], atol=1e-4)
+
+    loaded.delete(["p0#y1"])
+    assert loaded.get(ids=["p0#y1", "p1#y1"])["ids"] == ["p1#y1"]
+
+
+def test_bulk_upsert_and_length_sorted_encode(monkeypatch):
+    from src.rag_mcp.index import embedder
+    from src.rag_mcp.index.store import upsert_chunks
+    from src.rag_mcp.index.store_exact import ExactCollection
+
+    model = FakeEmbedder(lambda t: [len(t), 1.0])
+    monkeypatch.setattr(embedder, "_embedder", model)
+    texts = ["a" * n for n in (3, 9, 1, 7, 5)]
+    out = embedder.encode(texts, batch_size=2, use_cache=False)
+    assert out[:, 0].tolist() == [3, 9, 1, 7, 5]  # input order restored
+    # longest first, similar lengths per batch
+    assert [[len(t) for t in b] for b in model.batches] == [[9, 7], [5, 3], [1]]
+
+    chunks = [{"id": t, "text": t, "metadata": {"n": len(t)}} for t in texts]
+    col = ExactCollection([], [], [])
+    assert upsert_chunks(None, col, chunks, embeddings=out, batch_size=2) == 3
+    assert col.count() == 5
+    assert col.get(ids=["aaaaaaaaa"], include=["embeddings"])["embeddings"][0] == [9.0, 1.0]
+
+
+def test_embedding_cache_encodes_only_new_texts(tmp_path, monkeypatch):
+    from src.rag_mcp.index import embedder
+    from src.rag_mcp.index.embed_cache import EmbeddingCache
+
+    model = FakeEmbedder(lambda t: [len(t), 1.0])
+    monkeypatch.setattr(embedder, "_embedder", model)
+    monkeypatch.setattr(embedder, "_embed_cache", EmbeddingCache(str(tmp_path), "m1"))
+    first = embedder.encode(["aa", "b", "aa"])
+    assert sorted(sum(model.batches, [])) == ["aa", "b"]  # duplicates encoded once
+
+    # a rebuild from disk: only the edited chunk text reaches the model
+    monkeypatch.setattr(embedder, "_embed_cache", EmbeddingCache(str(tmp_path), "m1"))
+    again = embedder.encode(["b", "cccc", "aa"])
+    assert sum(model.batches, [])[2:] == ["cccc"]
+    assert again.tolist() == [first[1].tolist(), [4.0, 1.0], first[0].tolist()]
+
+    # everything cached: the model is not needed at all
+    monkeypatch.setattr(embedder, "_embedder", None)
+    monkeypatch.setattr(embedder, "get_embedder", lambda: (_ for _ in ()).throw(AssertionError("model loaded")))
+    assert embedder.encode(["cccc"]).tolist() == [[4.0, 1.0]]
+
+    # another model id starts cold
+    assert EmbeddingCache(str(tmp_path), "m2").lookup(["aa"]) == ({}, [0])